@@ -0,0 +1,81 @@
+import argparse
+import random
+import sys
+import threading
+import time
+from central import Central
+
+def check_top(c, failures):
+    top = c.top_n(10)
+    scores = [score for _, score in top]
+    if scores != sorted(scores, reverse=True):
+        failures.append(f"top_n not ordered: {scores}")
+
+def check_history(c, number, seen, failures):
+    rows, _ = c.history(number, limit=None)
+    starts = [c.calls.start[r] for r in rows]
+    if starts != sorted(starts):
+        failures.append(f"history of {number} not in time order")
+    if len(rows) < seen.get(number, 0):
+        failures.append(f"history of {number} shrank from {seen[number]} to {len(rows)}")
+    seen[number] = len(rows)
+
+def check_search(c, number, failures):
+    found = c.search_page("phone", number[:4], limit=20)[0]
+    if any(not n.startswith(number[:4]) for n in found):
+        failures.append(f"search for {number[:4]!r} returned {found}")
+
+def reader(c, numbers, stop, counts, failures, seed):
+    rng = random.Random(seed)
+    seen = {}
+    done = 0
+    while not stop.is_set():
+        number = rng.choice(numbers)
+        try:
+            check_top(c, failures)
+            check_history(c, number, seen, failures)
+            check_search(c, number, failures)
+            c.pair_history(number, rng.choice(numbers), limit=20)
+            c.rank(number)
+            c.traffic_series("hour")
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+            break
+        done += 1
+    counts.append(done)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run searches and history reads while a stress test ingests calls.")
+    parser.add_argument("--calls", type=int, default=100000, help="calls loaded from calls.txt before the run")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+    c = Central()
+    c.load_phonebook()
+    c.load_calls(limit=args.calls)
+    c.load_blocked()
+    numbers = list(c.phonebook.keys())
+    c.start_stress_test(duration_seconds=args.seconds, target_calls=10**9, workers=args.writers)
+    stop = threading.Event()
+    counts = []
+    failures = []
+    readers = [threading.Thread(target=reader, args=(c, numbers, stop, counts, failures, i)) for i in range(args.readers)]
+    for t in readers:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in readers:
+        t.join()
+    if c.stress.is_alive():
+        c.stop_stress_test()
+    accepted = c.stress.stats["accepted"]
+    print(f"[i] {sum(counts)} read rounds on {args.readers} threads, {accepted} calls ingested on {args.writers} workers in {args.seconds:.0f} s")
+    if failures:
+        for failure in failures[:20]:
+            print("[!]", failure)
+        sys.exit(1)
+    print("[i] All reads were consistent.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import random
+import time
+from data_structures.ChainHashMap import ChainHashMap
+from data_structures.ProbeHashMap import ProbeHashMap
+
+def make_keys(n, seed=7):
+    rnd = random.Random(seed)
+    return [f"0{rnd.randrange(10**8, 10**12)}" for _ in range(n)]
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def bench_map(cls, keys, misses):
+    results = {}
+    m = cls()
+    def insert():
+        for i, k in enumerate(keys):
+            m[k] = i
+    def hit():
+        for k in keys:
+            m[k]
+    def miss():
+        for k in misses:
+            k in m
+    def get():
+        for k in keys:
+            m.get(k)
+    def items():
+        for _ in m.items():
+            pass
+    results["insert"] = timed(insert)
+    results["lookup"] = timed(hit)
+    results["get"] = timed(get)
+    results["miss"] = timed(miss)
+    results["items"] = timed(items)
+    if hasattr(cls, "from_items"):
+        pairs = [(k, i) for i, k in enumerate(keys)]
+        results["bulk_build"] = timed(lambda: cls.from_items(pairs))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="ChainHashMap vs ProbeHashMap")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[65536, 1000000])
+    args = parser.parse_args()
+    for n in args.sizes:
+        keys = make_keys(n)
+        misses = make_keys(n // 10, seed=11)
+        print(f"--- {n} keys ---")
+        rows = {cls.__name__: bench_map(cls, keys, misses) for cls in (ChainHashMap, ProbeHashMap)}
+        ops = ["insert", "lookup", "get", "miss", "items", "bulk_build"]
+        print(f"{'op':<12}" + "".join(f"{name:>16}" for name in rows) + f"{'speedup':>10}")
+        for op in ops:
+            chain = rows["ChainHashMap"].get(op)
+            probe = rows["ProbeHashMap"].get(op)
+            cells = "".join(f"{t:>15.3f}s" if t is not None else f"{'-':>16}" for t in (chain, probe))
+            speedup = f"{chain / probe:>9.1f}x" if chain and probe else f"{'-':>10}"
+            print(f"{op:<12}{cells}{speedup}")
+
+if __name__ == "__main__":
+    main()
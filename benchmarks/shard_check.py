@@ -0,0 +1,76 @@
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from call_parser import iter_call_batches
+from central import Central, CALLS_FILE
+from sharding import ShardedCentral, SHARDS
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+def compare(c, s, numbers, failures):
+    expected = [score for _, score in c.top_n(20)]
+    got = [score for _, score in s.top_n(20)]
+    if expected != got:
+        failures.append(f"top_n scores differ: {expected[:5]} vs {got[:5]}")
+    for number in numbers:
+        rows, _ = c.history(number, limit=None)
+        expected = [c.calls.row(r) for r in rows]
+        got, _ = s.history(number, limit=None)
+        if expected != got:
+            failures.append(f"history of {number}: {len(expected)} vs {len(got)} calls")
+        if c.score(number) != s.score(number):
+            failures.append(f"score of {number}: {c.score(number)} vs {s.score(number)}")
+        for kind, prefix in (("phone", number[:4]), ("first", c.phonebook[number].first_name[:2])):
+            expected = [c.score(n) for n in c.search_page(kind, prefix, 20)[0]]
+            got = [s.score(n) for n in s.search_page(kind, prefix, 20)]
+            if expected != got:
+                failures.append(f"search {kind} {prefix!r}: {expected[:5]} vs {got[:5]}")
+
+def ingest_rate(target, batches):
+    start = time.perf_counter()
+    for batch in batches:
+        target.ingest_calls(batch)
+    return sum(map(len, batches)) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check sharded results against one Central and time ingestion per shard count.")
+    parser.add_argument("--calls", type=int, default=100000, help="calls loaded before the checks")
+    parser.add_argument("--ingest", type=int, default=200000, help="calls ingested for the throughput run")
+    parser.add_argument("--shards", type=int, nargs="+", default=sorted({1, 2, SHARDS}))
+    parser.add_argument("--batch", type=int, default=4096)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    batches = list(iter_call_batches(CALLS_FILE, limit=args.calls + args.ingest, batch_size=args.batch))
+    preload = args.calls // args.batch
+    load, replay = batches[:preload], batches[preload:]
+    c = Central()
+    quiet(c.load_phonebook)
+    quiet(c.load_blocked)
+    for batch in load:
+        c.ingest_calls(batch)
+    numbers = random.Random(7).sample(list(c.phonebook.keys()), args.samples)
+    failures = []
+    single = ingest_rate(c, replay)
+    print(f"{'single Central':<16}{single:>12,.0f} calls/s")
+    for count in args.shards:
+        with ShardedCentral(count) as s:
+            quiet(s.load_phonebook)
+            quiet(s.load_blocked)
+            for batch in load:
+                s.ingest_calls(batch)
+            rate = ingest_rate(s, replay)
+            print(f"{f'{count} shards':<16}{rate:>12,.0f} calls/s{rate / single:>8.2f}x")
+            compare(c, s, numbers, failures)
+    if failures:
+        for failure in failures[:20]:
+            print("[!]", failure)
+        sys.exit(1)
+    print(f"[i] Sharded top_n, history, scores and searches match a single Central ({len(numbers)} numbers checked).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from central import Central, PHONEBOOK_FILE, CALLS_FILE
+
+TOLERANCE = 0.25
+MIN_DELTA_US = 20
+QUERIES = 500
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+class Suite:
+    def __init__(self, repeat=3, queries=QUERIES, seed=7):
+        self.repeat = repeat
+        self.queries = queries
+        self.rng = random.Random(seed)
+        self.results = {}
+    def record(self, name, seconds, ops=1):
+        self.results[name] = {"seconds": seconds, "ops": ops, "per_op_us": seconds / ops * 1e6, "peak_rss_mb": round(peak_rss_mb(), 1)}
+        print(f"{name:<32}{seconds:>10.3f}s{seconds / ops * 1e6:>14.1f} us/op{peak_rss_mb():>10.0f} MB")
+    def once(self, name, fn, ops=1):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        self.record(name, time.perf_counter() - start, ops)
+        return result
+    def each(self, name, fn, args):
+        runs = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                for arg in args:
+                    fn(*arg)
+                runs.append(time.perf_counter() - start)
+        self.record(name, min(runs), len(args))
+    def sample(self, values, k=None):
+        return self.rng.sample(values, min(k or self.queries, len(values)))
+
+def typo(rng, text):
+    i = rng.randrange(len(text))
+    return text[:i] + rng.choice("0123456789" if text[i].isdigit() else "aeiou") + text[i + 1:]
+
+def run_queries(suite, c, tag):
+    rng = suite.rng
+    entries = suite.sample(list(c.phonebook.values()))
+    numbers = [e.number for e in entries]
+    suite.once(f"{tag}.first_search", lambda: c.search_by_first(entries[0].first_name[:2]))
+    suite.each(f"{tag}.search_by_first", c.search_by_first, [(e.first_name[:2],) for e in entries])
+    suite.each(f"{tag}.search_by_last", c.search_by_last, [(e.last_name[:3],) for e in entries])
+    suite.each(f"{tag}.search_by_phone", c.search_by_phone, [(n[:4],) for n in numbers])
+    suite.each(f"{tag}.autocomplete", c.autocomplete, [(e.first_name[:1],) for e in entries])
+    suite.each(f"{tag}.suggest_similar_numbers", c.suggest_similar_numbers, [(typo(rng, n),) for n in numbers[:100]])
+    suite.each(f"{tag}.suggest_similar_names", c.suggest_similar_names, [(typo(rng, f"{e.first_name} {e.last_name}"),) for e in entries[:100]])
+    suite.each(f"{tag}.show_history_1", c.show_history_1, [(n,) for n in numbers])
+    pairs = [c.calls.row(row)[:2] for row in suite.sample(range(len(c.calls)))]
+    suite.each(f"{tag}.show_history_2", c.show_history_2, pairs)
+    suite.each(f"{tag}.top_n", c.top_n, [(10,)] * 100)
+
+def run(args):
+    suite = Suite(args.repeat, args.queries, args.seed)
+    workdir = tempfile.mkdtemp(prefix="tc_bench_")
+    for size in args.sizes:
+        tag = f"{size // 1000}k" if size < 10**6 else f"{size / 10**6:g}M"
+        c = Central()
+        c.journal_path = os.path.join(workdir, "calls.journal")
+        suite.once(f"{tag}.load_phonebook", lambda: c.load_phonebook(args.phonebook))
+        suite.once(f"{tag}.load_calls", lambda: c.load_calls(args.calls, limit=size), size)
+        run_queries(suite, c, tag)
+        path = os.path.join(workdir, f"state_{tag}.snap")
+        suite.once(f"{tag}.save_state", lambda: c.save_state(path))
+        d = Central()
+        d.journal_path = c.journal_path
+        suite.once(f"{tag}.load_state", lambda: d.load_state(path))
+        run_queries(suite, d, f"{tag}.snap")
+        del c, d
+    shutil.rmtree(workdir, ignore_errors=True)
+    return suite
+
+def compare(results, baseline, tolerance, min_delta_us=MIN_DELTA_US):
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is None or not base["per_op_us"]:
+            continue
+        ratio = current["per_op_us"] / base["per_op_us"]
+        if ratio > 1 + tolerance and current["per_op_us"] - base["per_op_us"] > min_delta_us:
+            regressions.append((name, base["per_op_us"], current["per_op_us"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Central hot paths and compare against a baseline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 1000000])
+    parser.add_argument("--phonebook", default=PHONEBOOK_FILE)
+    parser.add_argument("--calls", default=CALLS_FILE)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results file; exit 1 if any op got slower than the tolerance")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--min-delta-us", type=float, default=MIN_DELTA_US, help="ignore slowdowns smaller than this per op")
+    args = parser.parse_args()
+    print(f"{'benchmark':<32}{'total':>11}{'per op':>20}{'peak RSS':>13}")
+    suite = run(args)
+    report = {"meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "platform": platform.platform(), "sizes": args.sizes, "repeat": args.repeat, "queries": args.queries},
+              "results": suite.results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[i] Results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(suite.results, json.load(f), args.tolerance, args.min_delta_us)
+        for name, before, after, ratio in regressions:
+            print(f"[!] {name}: {before:.1f} -> {after:.1f} us/op ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"[i] No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import time
+from datetime import datetime, timedelta
+
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+CHUNK_SIZE = 1 << 22
+BATCH_SIZE = 65536
+
+def to_epoch(date):
+    return int((date - EPOCH).total_seconds())
+
+def from_epoch(secs):
+    return EPOCH + timedelta(seconds=secs)
+
+def format_duration(secs):
+    return "%02d:%02d:%02d" % (secs // 3600, secs // 60 % 60, secs % 60)
+
+_day_text = {}
+
+def format_start(secs):
+    day, secs = divmod(secs, 86400)
+    text = _day_text.get(day)
+    if text is None:
+        text = _day_text[day] = from_epoch(day * 86400).strftime("%d.%m.%Y")
+    return "%s %02d:%02d:%02d" % (text, secs // 3600, secs // 60 % 60, secs % 60)
+
+def format_call(call):
+    return f"{call[0]}, {call[1]}, {format_start(call[2])}, {format_duration(call[3])}\n"
+
+class ParseStats:
+    def __init__(self):
+        self.rows = 0
+        self.malformed = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+    def __str__(self):
+        return f"{self.rows} rows in {self.elapsed:.2f}s ({self.rows_per_second():,.0f} rows/s), {self.malformed} malformed"
+
+class CallParser:
+    def __init__(self):
+        self.day_cache = {}
+    def day_seconds(self, date_text):
+        secs = self.day_cache.get(date_text)
+        if secs is None:
+            d, m, y = date_text.split(".")
+            secs = (datetime(int(y), int(m), int(d)) - EPOCH).days * 86400
+            self.day_cache[date_text] = secs
+        return secs
+    def parse_lines(self, lines, stats, out):
+        day_cache = self.day_cache
+        day_seconds = self.day_seconds
+        append = out.append
+        for line in lines:
+            parts = line.split(",")
+            if len(parts) != 4:
+                if line.strip():
+                    stats.malformed += 1
+                continue
+            caller_number = parts[0].strip()
+            callee_number = parts[1].strip()
+            date_text, _, clock = parts[2].strip().partition(" ")
+            try:
+                start = day_cache.get(date_text)
+                if start is None:
+                    start = day_seconds(date_text)
+                h, m, s = clock.split(":")
+                dh, dm, ds = parts[3].split(":")
+                h, m, s, dh, dm, ds = int(h), int(m), int(s), int(dh), int(dm), int(ds)
+                if not (0 <= h < 24 and 0 <= m < 60 and 0 <= s < 60 and dh >= 0 and 0 <= dm < 60 and 0 <= ds < 60):
+                    raise ValueError("time out of range")
+                if not caller_number or not callee_number:
+                    raise ValueError("empty number")
+                append((caller_number, callee_number, start + h * 3600 + m * 60 + s, dh * 3600 + dm * 60 + ds))
+            except ValueError:
+                stats.malformed += 1
+        return out
+
+def read_lines(path, chunk_size=CHUNK_SIZE, offset=0, stats=None, end=None):
+    with open(path, "rb") as file:
+        file.seek(offset)
+        left = end - offset if end is not None else -1
+        tail = b""
+        while left:
+            chunk = file.read(chunk_size if left < 0 else min(chunk_size, left))
+            left -= len(chunk) if left > 0 else 0
+            if not chunk:
+                break
+            if stats is not None:
+                stats.bytes += len(chunk)
+            chunk = tail + chunk
+            cut = chunk.rfind(b"\n") + 1
+            tail = chunk[cut:]
+            if cut:
+                yield chunk[:cut].decode("utf-8", errors="replace").split("\n")
+        if tail:
+            yield [tail.decode("utf-8", errors="replace")]
+
+def iter_call_batches(path, limit=None, batch_size=BATCH_SIZE, stats=None, offset=0, end=None):
+    stats = stats if stats is not None else ParseStats()
+    parser = CallParser()
+    batch = []
+    for lines in read_lines(path, offset=offset, stats=stats, end=end):
+        while lines:
+            if limit:
+                need = limit - stats.rows - len(batch)
+                head, lines = lines[:need], lines[need:]
+            else:
+                head, lines = lines, None
+            parser.parse_lines(head, stats, batch)
+            while len(batch) >= batch_size:
+                stats.rows += batch_size
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+            if limit and stats.rows + len(batch) >= limit:
+                break
+        if limit and stats.rows + len(batch) >= limit:
+            break
+    if batch:
+        stats.rows += len(batch)
+        yield batch
+    stats.finish()
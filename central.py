@@ -1,18 +1,38 @@
-from data_structures.ChainHashMap import ChainHashMap
+from data_structures.ProbeHashMap import ProbeHashMap
 from data_structures.Trie import Trie
-from data_structures.DynamicArray import DynamicArray
+from data_structures.CallStore import CallStore
 from data_structures.PopularityGraph import PopularityGraph
+from data_structures.NumberTable import NumberTable
+from data_structures.DigitIndex import DigitIndex
+from data_structures.NameIndex import NameIndex
+from data_structures.TrafficIndex import TrafficIndex
+from snapshot import Snapshot, SnapshotWriter, delta_path, delta_paths
+from stress import StressTest, WORKERS, MEMORY_EVERY
+from rwlock import RWLock
+from profiling import Profiler
+import memory
+from journal import CallJournal, repair_journal, JOURNAL_FILE, GROUP_SIZE, GROUP_MS
+from call_parser import ParseStats, iter_call_batches, BATCH_SIZE, to_epoch, from_epoch, format_duration, DATE_FORMAT
 
+import gc
+import os
 import threading
+from contextlib import contextmanager
+from array import array
 import time
-import pickle
 from datetime import datetime, timedelta
-import random
 
 PHONEBOOK_FILE = "phones.txt"
 CALLS_FILE = "calls.txt"
 BLOCKED_FILE = "blocked.txt"
-SERIAL_FILE = "saved_state.pkl"
+SERIAL_FILE = "saved_state.snap"
+LEADER_REBUILD_RATIO = 8
+HISTORY_PAGE = 50
+INDEX_PROGRESS_STEP = 4096
+BACKGROUND_BATCH = 2048
+STAGES = {"indexes": "search indexes", "calls": "call history"}
+COMPACT_DELTAS = 8
+COMPACT_RATIO = 0.25
 
 class PhoneBookEntry:
     def __init__(self, first_name = "", last_name = "", number = ""):
@@ -35,22 +55,113 @@ class CallRecord:
 
 class Central:
     def __init__(self):
-        self.phonebook = ChainHashMap()
-        self.calls = DynamicArray()
+        self.numbers = NumberTable()
+        self.phonebook = ProbeHashMap()
+        self.calls = CallStore(self.numbers)
         self.blocked = set()
-        self.trie_first_name = Trie()
-        self.trie_last_name = Trie()
-        self.trie_phone_number = Trie()
-        self.popularity_graph = PopularityGraph()
-        self.calls_by_number = ChainHashMap()
-        self.calls_by_pair = ChainHashMap()
-        self.stress_thread = None
-        self.stress_event = threading.Event()
-        self.stress_pause = threading.Event()
-        self.stress_stats = {"generated":0, "accepted":0, "blocked":0, "total_duration":0.0}
-        self.stress_lock = threading.Lock()
-
-    def load_phonebook(self, path=PHONEBOOK_FILE):
+        self.popularity_graph = PopularityGraph(self.numbers)
+        self.trie_first_name = Trie(score=self.popularity_graph.get_score)
+        self.trie_last_name = Trie(score=self.popularity_graph.get_score)
+        self.trie_phone_number = Trie(score=self.popularity_graph.get_score)
+        self.number_index = DigitIndex()
+        self.name_index = NameIndex()
+        self.traffic = TrafficIndex()
+        self._traffic_ready = True
+        self._snapshot = None
+        self.journal = None
+        self.journal_path = JOURNAL_FILE
+        self.stress = None
+        self.active_calls = {}
+        self._next_call_id = 1
+        self.lock = RWLock()
+        self.ready = {name: threading.Event() for name in STAGES}
+        for event in self.ready.values():
+            event.set()
+        self.progress = {}
+        self._building = set()
+        self._stage_lock = threading.Lock()
+        self._bulk_users = 0
+        self.profiler = Profiler(self)
+        self._checkpoint = None
+        self._checkpoint_lock = threading.Lock()
+        self._changed_contacts = set()
+        self._changed_blocked = set()
+
+    def startup(self, state_path=SERIAL_FILE, background=False):
+        if os.path.exists(state_path):
+            self.load_state(state_path)
+            self.open_journal(self.journal_path)
+            if background:
+                self.start_stage("indexes", self._build_indexes)
+        elif not background:
+            self.load_phonebook()
+            self.load_calls()
+            self.load_blocked()
+            self.recover_journal()
+            self.open_journal(self.journal_path)
+        else:
+            self.load_phonebook(index=False)
+            self.load_blocked()
+            journal_end = repair_journal(self.journal_path)
+            self.open_journal(self.journal_path)
+            self.start_stage("indexes", self._build_indexes)
+            self.start_stage("calls", lambda: self._load_history(journal_end))
+
+    def start_stage(self, name, build):
+        with self._stage_lock:
+            if name in self._building:
+                return None
+            self._building.add(name)
+            self.ready[name].clear()
+            self.progress[name] = (0, 0)
+        def run():
+            started = time.perf_counter()
+            try:
+                build()
+                print(f"\n[i] {STAGES[name].capitalize()} ready ({time.perf_counter() - started:.1f} s).")
+            except Exception as e:
+                print(f"\n[!] Loading {STAGES[name]} failed: {e}")
+            finally:
+                with self._stage_lock:
+                    self._building.discard(name)
+                self.ready[name].set()
+        th = threading.Thread(target=run, name=f"load-{name}", daemon=True)
+        th.start()
+        return th
+
+    def wait_for(self, name):
+        event = self.ready[name]
+        if event.is_set():
+            return
+        done, total = self.progress.get(name, (0, 0))
+        pct = f" ({100 * done / total:.0f}%)" if total else ""
+        print(f"[i] Waiting for {STAGES[name]} to finish loading{pct}...")
+        event.wait()
+
+    def status(self):
+        out = {}
+        for name in STAGES:
+            done, total = self.progress.get(name, (0, 0))
+            out[name] = 1.0 if self.ready[name].is_set() else (done / total if total else 0.0)
+        return out
+
+    @contextmanager
+    def _bulk(self):
+        with self._stage_lock:
+            self._bulk_users += 1
+            if self._bulk_users == 1:
+                gc.disable()
+        try:
+            yield
+        finally:
+            with self._stage_lock:
+                self._bulk_users -= 1
+                if not self._bulk_users:
+                    gc.freeze()
+                    gc.enable()
+
+    def load_phonebook(self, path=PHONEBOOK_FILE, index=True, keep=None):
+        contacts = []
         with open(path,encoding='utf-8') as file:
             next(file)
             for line in file:
@@ -64,153 +175,344 @@ class Central:
                     name_split = full_name.split(" ")
                     first_name = name_split[0].strip()
                     last_name = name_split[1].strip()
-                e = PhoneBookEntry(first_name = first_name, last_name = last_name, number = number)
-                if number:
-                    self.phonebook[number] = e
-                    self.trie_first_name.insert(first_name,number)
-                    self.trie_last_name.insert(last_name,number)
-                    self.trie_phone_number.insert(number,number)
+                if number and (keep is None or keep(number)):
+                    contacts.append((first_name, last_name, number))
+        self.wait_for("indexes")
+        with self.lock.write():
+            intern = self.numbers.intern
+            numbers = self.numbers.numbers
+            phonebook = self.phonebook
+            for first_name, last_name, number in contacts:
+                number = numbers[intern(number)]
+                phonebook[number] = PhoneBookEntry(first_name = first_name, last_name = last_name, number = number)
+            self._changed_contacts.update(phonebook.keys())
+            self.ready["indexes"].clear()
+        if index:
+            self._ensure_indexes()
+
+    def add_contact(self, first_name, last_name, number, refresh_leaders=True):
+        self._ensure_indexes()
+        with self.lock.write():
+            nid = self.numbers.intern(number)
+            number = self.numbers[nid]
+            self.phonebook[number] = PhoneBookEntry(first_name = first_name, last_name = last_name, number = number)
+            self._changed_contacts.add(number)
+            self._index_contact(self.phonebook[number], nid, self._indexes())
+            if refresh_leaders:
+                self.refresh_leaders({nid})
+        return nid
+
+    def _indexes(self):
+        return self.trie_first_name, self.trie_last_name, self.trie_phone_number, self.number_index, self.name_index
+
+    def _index_contact(self, entry, nid, indexes):
+        first_trie, last_trie, phone_trie, number_index, name_index = indexes
+        if entry.first_name:
+            first_trie.insert(entry.first_name,nid)
+        if entry.last_name:
+            last_trie.insert(entry.last_name,nid)
+        phone_trie.insert(entry.number,nid)
+        number_index.add(nid, entry.number)
+        name_index.add(nid, entry.first_name, entry.last_name)
+
+    def _build_indexes(self):
+        score = self.popularity_graph.get_score
+        indexes = (Trie(score=score), Trie(score=score), Trie(score=score), DigitIndex(), NameIndex())
+        with self.lock.read():
+            entries = list(self.phonebook.values())
+        nid_of = self.numbers.get
+        with self._bulk():
+            for i, entry in enumerate(entries):
+                self._index_contact(entry, nid_of(entry.number), indexes)
+                if not i % INDEX_PROGRESS_STEP:
+                    self.progress["indexes"] = (i, len(entries))
+        with self.lock.write():
+            self.trie_first_name, self.trie_last_name, self.trie_phone_number, self.number_index, self.name_index = indexes
+            self.ready["indexes"].set()
+            self.refresh_leaders()
 
     def load_blocked(self,path=BLOCKED_FILE):
         with open(path,encoding='utf-8') as file:
-            for line in file:
-                line = line.strip()
-                if not line:
-                    continue
-                self.blocked.add(line)
+            numbers = {line.strip() for line in file if line.strip()}
+        with self.lock.write():
+            self._changed_blocked.update(numbers - self.blocked)
+            self.blocked.update(numbers)
 
-    def load_calls(self,path=CALLS_FILE,limit=None):
-        self.calls.clear()
-        self.calls_by_number.clear()
-        self.calls_by_pair.clear()
-        with open(path,encoding='utf-8') as file:
-            for idx,line in enumerate(file):
-                if limit and idx>=limit:
-                    break
-                parts = [p.strip() for p in line.strip().split(",")]
-                caller_number, callee_number, date_start, duration_time = parts[0].strip(),parts[1].strip(),parts[2].strip(),parts[3].strip()
-                try:
-                    start_date = datetime.strptime(date_start,"%d.%m.%Y %H:%M:%S")
-                except:
-                    start_date = datetime.now()
-                try:
-                    h,m,s = (int(x) for x in duration_time.split(":"))
-                    duration = timedelta(hours=h,minutes=m,seconds=s)
-                except:
-                    duration = timedelta()
-                record = CallRecord(caller_number,callee_number,start_date,duration)
-                self.calls.append(record)
-                pair_key = tuple(sorted([caller_number, callee_number]))
-                if pair_key not in self.calls_by_pair:
-                    self.calls_by_pair[pair_key] = DynamicArray()
-                self.calls_by_pair[pair_key].append(record)
-                for num in [caller_number, callee_number]:
-                    if num not in self.calls_by_number:
-                        self.calls_by_number[num] = DynamicArray()
-                    self.calls_by_number[num].append(record)
-                self.popularity_graph.record_call(caller_number,callee_number,record.duration_time.total_seconds())
+    def load_calls(self,path=CALLS_FILE,limit=None,clear=True,batch_size=BATCH_SIZE,keep=None):
+        if clear:
+            with self.lock.write():
+                self.calls.clear()
+                self.traffic.clear()
+                self._checkpoint = None
+        stats = ParseStats()
+        total = limit or os.path.getsize(path)
+        with self._bulk():
+            for batch in iter_call_batches(path, limit=limit, batch_size=batch_size, stats=stats):
+                if keep is not None:
+                    batch = [call for call in batch if keep(call)]
+                self.ingest_calls(batch, check_blocked=False, refresh_leaders=False, journal=False)
+                self.progress["calls"] = (stats.rows if limit else stats.bytes, total)
+            self._settle()
+        print(f"[i] Loaded calls: {stats}")
+        return stats
+
+    def _load_history(self, journal_end):
+        self.load_calls(clear=False, batch_size=BACKGROUND_BATCH)
+        self.recover_journal(end=journal_end)
+
+    def refresh_leaders(self, ids=None):
+        if not self.ready["indexes"].is_set():
+            return
+        with self.lock.write():
+            for trie in (self.trie_first_name, self.trie_last_name, self.trie_phone_number):
+                indexed = ids if ids is None else [nid for nid in ids if nid in trie.paths]
+                if indexed is None or len(indexed) * LEADER_REBUILD_RATIO > len(trie.paths):
+                    trie.rebuild()
+                else:
+                    trie.update_many(indexed)
+
+    def _settle(self):
+        with self.lock.write():
+            self.calls.tidy()
+            self.popularity_graph.sync()
+            self.refresh_leaders()
+
+    def open_journal(self, path=None, group_size=GROUP_SIZE, group_ms=GROUP_MS, fsync=False):
+        self.close_journal()
+        path = path or self.journal_path
+        self.journal_path = path
+        self.journal = CallJournal(path, group_size=group_size, group_ms=group_ms, fsync=fsync)
+        return self.journal
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def recover_journal(self, offset=0, path=None, end=None):
+        path = path or self.journal_path
+        if end is None:
+            if self.journal is not None:
+                self.journal.flush()
+            end = repair_journal(path)
+        if end <= offset:
+            return 0
+        stats = ParseStats()
+        with self._bulk():
+            for batch in iter_call_batches(path, stats=stats, offset=offset, end=end):
+                self.ingest_calls(batch, check_blocked=False, refresh_leaders=False, journal=False)
+            self._settle()
+        print(f"[i] Recovered journal tail: {stats}")
+        return stats.rows
+
+    def ingest_calls(self, batch, check_blocked=True, update_graph=True, refresh_leaders=True, journal=True):
+        blocked = 0
+        if check_blocked and self.blocked:
+            numbers = {call[0] for call in batch}
+            numbers.update(call[1] for call in batch)
+            hits = numbers & self.blocked
+            if hits:
+                accepted = [call for call in batch if call[0] not in hits and call[1] not in hits]
+                blocked = len(batch) - len(accepted)
+                batch = accepted
+        if batch:
+            with self.lock.write():
+                first = self.calls.extend(batch)
+                if journal and self.journal is not None:
+                    self.journal.append(batch)
+                if self._traffic_ready:
+                    self.traffic.add_many(self.calls.start[first:], self.calls.duration[first:])
+                if update_graph:
+                    self.popularity_graph.record_store(self.calls, first)
+                if refresh_leaders and self.ready["calls"].is_set():
+                    self.calls.tidy()
+                    self.popularity_graph.sync()
+                    if update_graph:
+                        changed = set(self.calls.caller[first:])
+                        changed.update(self.calls.callee[first:])
+                        self.refresh_leaders(changed)
+        return len(batch), blocked
+
+    def _journal_offset(self):
+        if self.journal is not None:
+            return self.journal.flush()
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    def _write_contacts(self, writer, entries, blocked):
+        writer.add("phonebook.ids", array('i', [self.numbers.get(e.number) for e in entries]))
+        writer.add_strings("phonebook.first", [e.first_name for e in entries])
+        writer.add_strings("phonebook.last", [e.last_name for e in entries])
+        writer.add_strings("blocked", sorted(blocked))
+
+    def _mark_checkpoint(self, path, checkpoint_id, sequence, base_calls):
+        self._checkpoint = {"path": path, "id": checkpoint_id, "sequence": sequence, "base_calls": base_calls,
+                            "calls": len(self.calls), "numbers": len(self.numbers)}
+        self._changed_contacts = set()
+        self._changed_blocked = set()
 
     def save_state(self, path=SERIAL_FILE):
-        data = {
-            "phonebook": {k:v.to_tuple() for k,v in self.phonebook.items()},
-            "blocked": list(self.blocked),
-            "pop_graph": self.popularity_graph.serialize(),
-            "calls": [ (call.caller_number,call.callee_number,call.start_date.strftime("%d.%m.%Y %H:%M:%S"), str(call.duration_time)) for call in self.calls]
-        }
-        with open(path, "wb") as f:
-            pickle.dump(data, f)
-            print("State successfully serialized!")
+        self.wait_for("calls")
+        writer = SnapshotWriter()
+        with self._checkpoint_lock, self.lock.read():
+            writer.add_strings("numbers", self.numbers)
+            self._write_contacts(writer, list(self.phonebook.values()), self.blocked)
+            self.calls.write_sections(writer)
+            self.popularity_graph.write_sections(writer)
+            checkpoint_id = os.urandom(8).hex()
+            writer.meta.update(calls=len(self.calls), journal_offset=self._journal_offset(), checkpoint=checkpoint_id)
+            writer.write(path)
+            for stale in delta_paths(path):
+                os.remove(stale)
+            self._mark_checkpoint(path, checkpoint_id, 0, len(self.calls))
+        print("State successfully serialized!")
+
+    def checkpoint(self, path=SERIAL_FILE):
+        self.wait_for("calls")
+        cp = self._checkpoint
+        if cp is None or cp["id"] is None or cp["path"] != path or not os.path.exists(path) or len(self.calls) < cp["calls"]:
+            return self.save_state(path)
+        if cp["sequence"] >= COMPACT_DELTAS or len(self.calls) - cp["base_calls"] > COMPACT_RATIO * max(cp["base_calls"], 1):
+            return self.compact(path)
+        writer = SnapshotWriter()
+        with self._checkpoint_lock, self.lock.read():
+            first = cp["calls"]
+            writer.add_strings("numbers", self.numbers.numbers[cp["numbers"]:])
+            self._write_contacts(writer, [self.phonebook[n] for n in self._changed_contacts if n in self.phonebook], self._changed_blocked)
+            self.calls.write_delta_sections(writer, first)
+            self.popularity_graph.write_delta_sections(writer, self.calls, first)
+            sequence = cp["sequence"] + 1
+            writer.meta.update(kind="delta", base=cp["id"], sequence=sequence, first_call=first, calls=len(self.calls),
+                               first_number=cp["numbers"], journal_offset=self._journal_offset())
+            writer.write(delta_path(path, sequence))
+            self._mark_checkpoint(path, cp["id"], sequence, cp["base_calls"])
+        print(f"[i] Checkpoint {sequence} written: {len(self.calls) - first} new calls.")
+
+    def compact(self, path=SERIAL_FILE):
+        deltas = len(delta_paths(path))
+        self.save_state(path)
+        print(f"[i] Compacted the base snapshot and {deltas} checkpoints into a new base.")
+
+    def _apply_delta(self, delta):
+        intern = self.numbers.intern
+        for number in delta.strings("numbers"):
+            intern(number)
+        numbers = self.numbers.numbers
+        for nid, first, last in zip(delta["phonebook.ids"], delta.strings("phonebook.first"), delta.strings("phonebook.last")):
+            self.phonebook[numbers[nid]] = PhoneBookEntry(first, last, numbers[nid])
+        self.blocked.update(delta.strings("blocked"))
+        self.calls.apply_delta(delta)
+        self.popularity_graph.apply_delta(delta)
 
     def load_state(self, path=SERIAL_FILE):
-        with open(path, "rb") as file:
-            data = pickle.load(file)
-        self.phonebook.clear()
-        for num,tup in data.get("phonebook",{}).items():
-            first,last,number = tup
-            self.phonebook[num] = PhoneBookEntry(first,last,number)
-            if first:
-                self.trie_first_name.insert(first,num)
-            if last:
-                self.trie_last_name.insert(last,num)
-            if number:
-                self.trie_phone_number.insert(number,num)
-        self.blocked = set(data.get("blocked",[]))
-        self.popularity_graph.deserialize(data.get("pop_graph",{}))
-        self.calls.clear()
-        self.calls_by_number.clear()
-        self.calls_by_pair.clear()
-        for caller_number, callee_number, date_start, duration_time in data.get("calls",[]):
-            try:
-                start_date = datetime.strptime(date_start, "%d.%m.%Y %H:%M:%S")
-            except:
-                start_date = datetime.now()
-            try:
-                h,m,s = (int(x) for x in duration_time.split(":"))
-                duration = timedelta(hours=h,minutes=m,seconds=s)
-            except:
-                duration = timedelta()
-            record = CallRecord(caller_number,callee_number,start_date,duration)
-            self.calls.append(record)
-            pair_key = tuple(sorted([caller_number, callee_number]))
-            if pair_key not in self.calls_by_pair:
-                self.calls_by_pair[pair_key] = DynamicArray()
-            self.calls_by_pair[pair_key].append(record)
-            for num in [caller_number, callee_number]:
-                if num not in self.calls_by_number:
-                    self.calls_by_number[num] = DynamicArray()
-                self.calls_by_number[num].append(record)
-            self.popularity_graph.record_call(caller_number,callee_number,record.duration_time.total_seconds())
+        for name in STAGES:
+            self.wait_for(name)
+        snapshot = Snapshot(path)
+        if snapshot.meta.get("kind") == "delta":
+            raise ValueError(f"{path} is a checkpoint delta; load its base snapshot instead")
+        with self.lock.write():
+            self.numbers.load(snapshot.strings("numbers"))
+            numbers = self.numbers.numbers
+            self.phonebook = ProbeHashMap.from_items(
+                (numbers[nid], PhoneBookEntry(first, last, numbers[nid]))
+                for nid, first, last in zip(snapshot["phonebook.ids"], snapshot.strings("phonebook.first"), snapshot.strings("phonebook.last")))
+            self.blocked = set(snapshot.strings("blocked"))
+            self.calls.attach(snapshot)
+            self.popularity_graph.attach(snapshot)
+            self.popularity_graph.sync()
+            score = self.popularity_graph.get_score
+            self.trie_first_name = Trie(score=score)
+            self.trie_last_name = Trie(score=score)
+            self.trie_phone_number = Trie(score=score)
+            self.number_index = DigitIndex()
+            self.name_index = NameIndex()
+            self.ready["indexes"].clear()
+            self.traffic = TrafficIndex()
+            self._traffic_ready = False
+            self._snapshot = snapshot
+            offset = snapshot.meta.get("journal_offset", 0)
+            checkpoint_id = snapshot.meta.get("checkpoint")
+            sequence = 0
+            while checkpoint_id is not None and os.path.exists(delta_path(path, sequence + 1)):
+                delta = Snapshot(delta_path(path, sequence + 1))
+                if delta.meta.get("base") != checkpoint_id or delta.meta.get("first_call") != len(self.calls):
+                    print(f"[!] Ignoring {delta_path(path, sequence + 1)}: it does not continue this snapshot")
+                    break
+                self._apply_delta(delta)
+                sequence += 1
+                offset = delta.meta["journal_offset"]
+            if sequence:
+                self.popularity_graph.sync()
+                print(f"[i] Applied {sequence} checkpoints ({len(self.calls) - len(snapshot['calls.caller'])} calls)")
+            self._mark_checkpoint(path, checkpoint_id, sequence, len(snapshot["calls.caller"]))
+            self.recover_journal(offset)
         print("State successfully loaded!")
 
+    def _ensure_indexes(self):
+        if self.ready["indexes"].is_set():
+            return
+        with self._stage_lock:
+            building = "indexes" in self._building
+            if not building:
+                self._building.add("indexes")
+        if building:
+            self.wait_for("indexes")
+            return
+        try:
+            self._build_indexes()
+        finally:
+            with self._stage_lock:
+                self._building.discard("indexes")
+
     def nice_entry(self,number):
-        if number in self.phonebook:
-            e = self.phonebook[number]
-            return f"{e.display()}"
-        return number
+        with self.lock.read():
+            e = self.phonebook.get(number)
+        return e.display() if e is not None else number
 
     def suggest_similar_numbers(self,number,n=5):
-        def similarity_score(number1,number2):
-            score = abs(len(number1)-len(number2))
-            for a,b in zip(number1,number2):
-                if a!=b:
-                    score +=1
-            return score
-        candidates = list(self.phonebook.keys())
-        ranked = sorted(candidates,key=lambda x:similarity_score(number,x))
-        return ranked[:n]
+        self._ensure_indexes()
+        numbers = self.numbers.numbers
+        with self.lock.read():
+            return [numbers[nid] for _, nid in self.number_index.nearest(number, n)]
 
     def suggest_similar_names(self,name,n=5):
-        def similarity_score(name1,name2):
-            name1=name1.lower()
-            name2=name2.lower()
-            prefix_len=0
-            for a,b in zip(name1,name2):
-                if a==b:
-                    prefix_len +=1
-                else:
-                    break
-            diff = abs(len(name1)-len(name2))
-            diff+=sum(1 for a,b in zip(name1,name2) if a !=b)
-            score = diff - (prefix_len)
-            return score
-        candidates = [f"{contact.first_name} {contact.last_name}" for contact in self.phonebook.values()]
-        ranked = sorted(candidates,key=lambda x:similarity_score(name,x))
-        return ranked[:n]
+        self._ensure_indexes()
+        with self.lock.read():
+            return [nid for _, nid in self.name_index.nearest(name, n)]
 
     def is_blocked(self, number):
         return number in self.blocked
 
-    def live_call(self,caller_number,callee_number):
+    def begin_call(self, caller_number, callee_number):
         caller_number = caller_number.strip()
         callee_number = callee_number.strip()
         if caller_number=="" or callee_number=="":
-            print("[!] You must enter both numbers.")
-            return
+            raise ValueError("You must enter both numbers.")
         if self.is_blocked(caller_number) or self.is_blocked(callee_number):
-            print("[!] Call rejected: one of the numbers is blocked.")
+            raise ValueError("Call rejected: one of the numbers is blocked.")
+        with self.lock.write():
+            call_id = self._next_call_id
+            self._next_call_id += 1
+            self.active_calls[call_id] = (caller_number, callee_number, datetime.now())
+        return call_id
+
+    def end_call(self, call_id):
+        with self.lock.write():
+            call = self.active_calls.pop(call_id, None)
+        if call is None:
+            raise ValueError(f"Unknown call {call_id}.")
+        caller_number, callee_number, start = call
+        dur = datetime.now() - start
+        self.ingest_calls([(caller_number, callee_number, to_epoch(start), int(dur.total_seconds()))])
+        return caller_number, callee_number, start, dur
+
+    def live_call(self,caller_number,callee_number):
+        try:
+            call_id = self.begin_call(caller_number, callee_number)
+        except ValueError as e:
+            print(f"[!] {e}")
             return
+        caller_number, callee_number, start = self.active_calls[call_id]
         print(f"[i] Starting call: {self.nice_entry(caller_number)} -> {self.nice_entry(callee_number)}")
-        start = datetime.now()
         stop_event = threading.Event()
         def waiter(evt):
             input("Press ENTER to end the call...........\n")
@@ -228,209 +530,286 @@ class Central:
                     last_print = now
         except KeyboardInterrupt:
             stop_event.set()
-        end = datetime.now()
-        dur = end - start
-        record = CallRecord(caller_number, callee_number, start, dur)
-        self.calls.append(record)
-        pair_key = tuple(sorted([caller_number, callee_number]))
-        if pair_key not in self.calls_by_pair:
-            self.calls_by_pair[pair_key] = DynamicArray()
-        self.calls_by_pair[pair_key].append(record)
-        for num in [caller_number, callee_number]:
-            if num not in self.calls_by_number:
-                self.calls_by_number[num] = DynamicArray()
-            self.calls_by_number[num].append(record)
-        self.popularity_graph.record_call(caller_number,callee_number,record.duration_time.total_seconds())
+        _, _, start, dur = self.end_call(call_id)
         print("\n--- CALL INFORMATION ---")
         print(f"Caller number: {self.nice_entry(caller_number)}")
         print(f"Callee number: {self.nice_entry(callee_number)}")
         print(f"Call started at: {start.strftime('%d.%m.%Y %H:%M:%S')}")
         print(f"Call duration: {str(dur).split('.')[0]}")
         print("---------------------")
-        with open("calls.txt", "a", encoding="utf-8") as file:
-            file.write(f"{caller_number},{callee_number},{start.strftime('%d.%m.%Y %H:%M:%S')},{str(dur).split('.')[0]}\n")
 
-    def simulate_calls_from_file(self,path=CALLS_FILE,limit=2000):
-        count = 0
-        with open(path,encoding='utf-8') as file:
-            for line in file:
-                if limit and count>=limit:
-                    break
-                parts = [part.strip() for part in line.strip().split(",")]
-                caller_number, callee_number, date_start, duration_time = parts[0], parts[1], parts[2], parts[3]
-                try:
-                    start_date = datetime.strptime(date_start, "%d.%m.%Y %H:%M:%S")
-                except:
-                    start_date = datetime.now()
-                try:
-                    h,m,s = (int(x) for x in duration_time.split(":"))
-                    duration = timedelta(hours=h, minutes=m, seconds=s)
-                except:
-                    duration = timedelta()
-                record = CallRecord(caller_number,callee_number,start_date,duration)
-                if self.is_blocked(caller_number) or self.is_blocked(callee_number):
-                    print("[!] Call rejected: one of the numbers is blocked.")
-                else:
-                    self.calls.append(record)
-                    pair_key = tuple(sorted([caller_number, callee_number]))
-                    if pair_key not in self.calls_by_pair:
-                        self.calls_by_pair[pair_key] = DynamicArray()
-                    self.calls_by_pair[pair_key].append(record)
-                    for num in [caller_number, callee_number]:
-                        if num not in self.calls_by_number:
-                            self.calls_by_number[num] = DynamicArray()
-                        self.calls_by_number[num].append(record)
-                    self.popularity_graph.record_call(caller_number,callee_number,record.duration_time.total_seconds())
-                    print(f"[i] Starting call: {self.nice_entry(record.caller_number)} -> {self.nice_entry(record.callee_number)}")
-                    print(f"{record.caller_number} -> {record.callee_number} | {record.start_date} | {record.duration_time}")
-                count+=1
-
-    def show_history_1(self,number):
-        records = sorted(self.calls_by_number.get(number, []), key=lambda r: r.start_date)
-        if not records:
+    def simulate_calls_from_file(self,path=CALLS_FILE,limit=2000,batch_size=500):
+        stats = ParseStats()
+        accepted = blocked = 0
+        for batch in iter_call_batches(path, limit=limit, batch_size=batch_size, stats=stats):
+            acc, blk = self.ingest_calls(batch)
+            accepted += acc
+            blocked += blk
+            last = batch[-1]
+            print(f"[i] Replayed {len(batch)} calls: {acc} accepted, {blk} rejected (blocked number).")
+            print(f"    last: {self.nice_entry(last[0])} -> {self.nice_entry(last[1])} | {from_epoch(last[2]).strftime(DATE_FORMAT)} | {format_duration(last[3])}")
+        print(f"[i] Simulation finished: {stats}; {accepted} accepted, {blocked} blocked.")
+        return accepted, blocked
+
+    def call_record(self, row):
+        caller_number, callee_number, start, duration = self.calls.row(row)
+        return CallRecord(caller_number, callee_number, from_epoch(start), timedelta(seconds=duration))
+
+    def history(self, number, start=None, end=None, limit=HISTORY_PAGE, cursor=None):
+        self.wait_for("calls")
+        with self.lock.read():
+            return self.calls.history(self.numbers.get(number), start, end, limit, cursor)
+
+    def pair_history(self, number1, number2, start=None, end=None, limit=HISTORY_PAGE, cursor=None):
+        self.wait_for("calls")
+        with self.lock.read():
+            return self.calls.pair_history(self.numbers.get(number1), self.numbers.get(number2), start, end, limit, cursor)
+
+    def show_history_1(self,number,start=None,end=None,limit=HISTORY_PAGE,cursor=None):
+        rows, next_cursor = self.history(number, start, end, limit, cursor)
+        if not rows and cursor is None:
             print("NO CALL HISTORY FOR THIS NUMBER!")
-            return
-        for record in records:
+        for row in rows:
+            record = self.call_record(row)
             role = "caller" if record.caller_number == number else "callee"
             other = record.callee_number if record.caller_number == number else record.caller_number
-            print(f"{record.start_date.strftime('%d.%m.%Y %H:%M:%S')} | {role} {number} <-> {other} | {str(record.duration_time).split('.')[0]}")
+            print(f"{record.start_date.strftime(DATE_FORMAT)} | {role} {number} <-> {other} | {str(record.duration_time).split('.')[0]}")
+        return next_cursor
 
-    def show_history_2(self,number1,number2):
-        key = tuple(sorted([number1,number2]))
-        records = sorted(self.calls_by_pair.get(key, []), key=lambda r: r.start_date)
-        if not records:
+    def show_history_2(self,number1,number2,start=None,end=None,limit=HISTORY_PAGE,cursor=None):
+        rows, next_cursor = self.pair_history(number1, number2, start, end, limit, cursor)
+        if not rows and cursor is None:
             print("NO CALL HISTORY BETWEEN THESE TWO NUMBERS!")
-            return
-        for record in records:
+        for row in rows:
+            record = self.call_record(row)
             role = f"{record.caller_number}->{record.callee_number}"
-            print(f"{record.start_date.strftime('%d.%m.%Y %H:%M:%S')} | {role} | {str(record.duration_time).split('.')[0]}")
+            print(f"{record.start_date.strftime(DATE_FORMAT)} | {role} | {str(record.duration_time).split('.')[0]}")
+        return next_cursor
+
+    def _ensure_traffic(self):
+        self.wait_for("calls")
+        if self._traffic_ready:
+            return
+        with self.lock.write():
+            if not self._traffic_ready:
+                self.traffic.add_many(self.calls.start, self.calls.duration)
+                self._traffic_ready = True
+
+    def last_call_time(self):
+        self._ensure_traffic()
+        return self.traffic.last
+
+    def traffic_series(self, resolution="hour", start=None, end=None, number=None):
+        if number is None:
+            self._ensure_traffic()
+            with self.lock.read():
+                return self.traffic.series(resolution, start, end)
+        rows, _ = self.history(number, start, end, limit=None)
+        calls = self.calls
+        return TrafficIndex.bucket_calls(((calls.start[r], calls.duration[r]) for r in rows), resolution, start, end)
+
+    def busiest_window(self, minutes=15, start=None, end=None, number=None):
+        return TrafficIndex.busiest(self.traffic_series("minute", start, end, number), minutes)
+
+    def show_traffic(self, resolution="hour", start=None, end=None, number=None, window=15):
+        series = self.traffic_series(resolution, start, end, number)
+        if not any(count for _, count, _ in series):
+            print("[!] No calls in this period.")
+            return
+        label = "%d.%m.%Y" if resolution == "day" else DATE_FORMAT
+        for bucket_start, count, seconds in series:
+            print(f"{from_epoch(bucket_start).strftime(label)} | calls={count} | minutes={seconds / 60:.1f}")
+        busiest = self.busiest_window(window, start, end, number)
+        if busiest and busiest[1]:
+            print(f"[i] Busiest {window}-minute window: {from_epoch(busiest[0]).strftime(DATE_FORMAT)} with {busiest[1]} calls ({busiest[2] / 60:.1f} minutes)")
+
+    def score(self, number):
+        nid = self.numbers.get(number)
+        return self.popularity_graph.get_score(nid) if nid is not None else 0
+
+    def _sync_scores(self):
+        if self.popularity_graph._dirty:
+            with self.lock.write():
+                self.popularity_graph.sync()
+
+    def rank(self, number):
+        nid = self.numbers.get(number)
+        if nid is None:
+            return None
+        self.wait_for("calls")
+        self._sync_scores()
+        with self.lock.read():
+            return self.popularity_graph.rank(nid)
+
+    def top_n(self, n=10):
+        self.wait_for("calls")
+        self._sync_scores()
+        numbers = self.numbers.numbers
+        with self.lock.read():
+            top = self.popularity_graph.top_n(n)
+        return [(numbers[nid], score) for nid, score in top]
+
+    def _trie(self, kind):
+        self._ensure_indexes()
+        if kind == "first":
+            return self.trie_first_name
+        if kind == "last":
+            return self.trie_last_name
+        return self.trie_phone_number
+
+    def search_page(self, kind, prefix, limit=20, cursor=None):
+        trie = self._trie(kind)
+        with self.lock.read():
+            ids, next_cursor = trie.ranked(prefix, limit=limit, cursor=cursor)
+        numbers = self.numbers.numbers
+        return [numbers[nid] for nid in ids], next_cursor
 
     def search_by_first(self,q,limit=50):
-        nums = self.trie_first_name.prefix_numbers(q, limit=limit)
-        sorted_nums = sorted(list(nums), key=lambda n: -self.popularity_graph.get_score(n))
-        return sorted_nums[:limit]
+        return self.search_page("first", q, limit)[0]
 
     def search_by_last(self, q, limit=200):
-        nums = self.trie_last_name.prefix_numbers(q, limit=limit)
-        sorted_nums = sorted(list(nums), key=lambda n: -self.popularity_graph.get_score(n))
-        return sorted_nums[:limit]
+        return self.search_page("last", q, limit)[0]
 
     def search_by_phone(self, pref, limit=200):
-        nums = self.trie_phone_number.prefix_numbers(pref, limit=limit)
-        sorted_nums = sorted(list(nums), key=lambda n: -self.popularity_graph.get_score(n))
-        return sorted_nums[:limit]
+        return self.search_page("phone", pref, limit)[0]
 
     def autocomplete(self,prefix,kind="first",limit=20):
-        if kind == "first":
-            numbers =  self.trie_first_name.prefix_numbers(prefix,limit=200)
-        elif kind == "last":
-            numbers = self.trie_last_name.prefix_numbers(prefix,limit=200)
-        else:
-            numbers = self.trie_phone_number.prefix_numbers(prefix,limit=200)
-        numbers_sorted = sorted(list(numbers), key=lambda n: -self.popularity_graph.get_score(n))
-        return numbers_sorted[:limit]
+        return self.search_page(kind, prefix, limit)[0]
 
     def print_pop_graph(self, limit=10):
-        self.popularity_graph.show_all()
+        self.wait_for("calls")
+        with self.lock.read():
+            rows = self.popularity_graph.edge_rows()
+        self.popularity_graph.show_all(rows)
         print(f"\nTop {limit} most popular numbers:")
-        scores = self.popularity_graph.top_n(limit)
+        scores = self.top_n(limit)
         for i, (number, score) in enumerate(scores, 1):
             contact = self.phonebook.get(number)
             name = f"{contact.first_name} | {contact.last_name} | {contact.number}" if contact else number
             print(f"{i}) {name} score={score}")
 
-    def start_stress_test(self,duration_seconds=60,target_calls=1000):
-        if self.stress_thread and self.stress_thread.is_alive():
+    def memory_report(self):
+        rows = []
+        def add(name, group, structure):
+            rows.append((name, group, structure.object_count()) + structure.memory_usage())
+        def entry_size(e):
+            return memory.getsizeof(e) + memory.getsizeof(e.__dict__) + memory.getsizeof(e.first_name) + memory.getsizeof(e.last_name)
+        with self.lock.read():
+            contacts = len(self.phonebook)
+            graph = self.popularity_graph
+            add("numbers", "contact", self.numbers)
+            rows.append(("phonebook", "contact", contacts) + self.phonebook.memory_usage(entry_size, key_size=lambda k: 0))
+            for name in ("trie_first_name", "trie_last_name", "trie_phone_number", "number_index", "name_index"):
+                add(name, "contact", getattr(self, name))
+            add("calls", "call", self.calls)
+            add("calls.by_pair", "call", self.calls.by_pair)
+            add("graph", "call", graph.graph)
+            add("graph.scores", "call", graph)
+            add("leaderboard", "call", graph.leaderboard)
+            add("traffic", "call", self.traffic)
+            rows.append(("active_calls", "other", len(self.active_calls), memory.heap(self.active_calls), 0))
+            if self.journal is not None:
+                rows.append(("journal.buffer", "other", len(self.journal.buffer), memory.heap(self.journal.buffer), 0))
+            call_count = len(self.calls)
+        heap = sum(r[3] for r in rows)
+        rss, rss_peak = memory.current_rss()
+        per_group = {group: sum(r[3] for r in rows if r[1] == group) for group in ("contact", "call")}
+        return {"rows": rows, "calls": call_count, "contacts": contacts, "heap": heap, "mapped": sum(r[4] for r in rows),
+                "rss": rss, "rss_peak": rss_peak,
+                "per_call": per_group["call"] / call_count if call_count else 0.0,
+                "per_contact": per_group["contact"] / contacts if contacts else 0.0}
+
+    def show_memory_report(self):
+        report = self.memory_report()
+        print(f"{'structure':<26}{'objects':>12}{'heap MB':>10}{'mapped MB':>11}")
+        for name, _, objects, heap, mapped in report["rows"]:
+            print(f"{name:<26}{objects:>12,}{memory.mb(heap):>10.1f}{memory.mb(mapped):>11.1f}")
+        print(f"{'total (estimated)':<26}{'':>12}{memory.mb(report['heap']):>10.1f}{memory.mb(report['mapped']):>11.1f}")
+        if report["rss"]:
+            print(f"[i] {'Peak process' if report['rss_peak'] else 'Process'} RSS: {memory.mb(report['rss']):.1f} MB")
+        print(f"[i] {report['per_call']:.0f} bytes per call ({report['calls']:,} calls), {report['per_contact']:.0f} bytes per contact ({report['contacts']:,} contacts)")
+        return report
+
+    def start_stress_test(self,duration_seconds=60,target_calls=1000,workers=WORKERS,rate=None):
+        if self.stress is not None and self.stress.is_alive():
             print("Stress test is already running.")
             return
         nums = list(self.phonebook.keys())
         if not nums:
             print("No numbers in phonebook for stress test!")
             return
-        self.stress_event.clear()
-        self.stress_pause.clear()
-        self.stress_stats = {"generated":0,"accepted":0,"blocked":0,"total_duration":0.0}
-        def worker():
-            start_time = time.time()
-            end_time = start_time + duration_seconds
-            calls_generated = 0
-            while time.time() < end_time and calls_generated < target_calls and not self.stress_event.is_set():
-                while self.stress_pause.is_set() and not self.stress_event.is_set():
-                    time.sleep(0.1)
-                caller_number = random.choice(nums)
-                callee_number = random.choice(nums)
-                if caller_number == callee_number:
-                    continue
-                if random.random() < 0.9:
-                    dur_secs = random.randint(1,300)
-                else:
-                    dur_secs = random.randint(300,3600)
-                start_date = datetime.now()
-                dur_td = timedelta(seconds=dur_secs)
-                with self.stress_lock:
-                    self.stress_stats["generated"]+=1
-                if self.is_blocked(caller_number) or self.is_blocked(callee_number):
-                    with self.stress_lock:
-                        self.stress_stats["blocked"]+=1
-                else:
-                    record = CallRecord(caller_number,callee_number, start_date, dur_td)
-                    self.calls.append(record)
-                    pair_key = tuple(sorted([caller_number, callee_number]))
-                    if pair_key not in self.calls_by_pair:
-                        self.calls_by_pair[pair_key] = DynamicArray()
-                    self.calls_by_pair[pair_key].append(record)
-                    for num in [caller_number, callee_number]:
-                        if num not in self.calls_by_number:
-                            self.calls_by_number[num] = DynamicArray()
-                        self.calls_by_number[num].append(record)
-                    self.popularity_graph.record_call(caller_number,callee_number,dur_secs)
-                    with self.stress_lock:
-                        self.stress_stats["accepted"]+=1
-                        self.stress_stats["total_duration"]+=dur_secs
-                calls_generated += 1
-                time.sleep(duration_seconds / max(1,target_calls)*0.5)
-            print("[i] Stress test thread finished.")
+        self.stress = StressTest(self, duration_seconds=duration_seconds, target_calls=target_calls, workers=workers,
+                                 rate=rate, numbers=nums, on_finish=self._stress_finished).start()
+        rate = f"{self.stress.rate:.0f} calls/s" if self.stress.rate else "unlimited rate"
+        print(f"[i] Stress test started: duration {duration_seconds} s, target {target_calls} calls, {self.stress.workers} workers, {rate}.")
+
+    def _stress_finished(self, test):
+        if not test.stop_event.is_set():
+            print("\n[i] Stress test finished.")
             self.stress_report()
-            input("Press ENTER to return to the MENU")
-        self._stress_thread = threading.Thread(target=worker, daemon=True)
-        self._stress_thread.start()
-        print("[i] Stress test started: duration", duration_seconds, "s, target", target_calls, "calls.")
 
     def pause_stress_test(self):
-        if not hasattr(self, "_stress_thread") or not self._stress_thread.is_alive():
+        if self.stress is None or not self.stress.is_alive():
             print("Stress test is not active.")
             return
-        self.stress_pause.set()
+        self.stress.pause()
         print("Stress test paused.")
 
     def resume_stress_test(self):
-        if not hasattr(self, "_stress_thread") or not self._stress_thread.is_alive():
+        if self.stress is None or not self.stress.is_alive():
             print("Stress test is not active.")
             return
-        self.stress_pause.clear()
+        self.stress.resume()
         print("Stress test resumed.")
 
+    def export_stress_csv(self, prefix="stress"):
+        if self.stress is None:
+            print("No stress test has been run.")
+            return None
+        paths = self.stress.export_csv(prefix)
+        print("[i] Stress data exported to", ", ".join(paths))
+        return paths
+
     def stop_stress_test(self):
-        if not self.stress_thread or not self.stress_thread.is_alive():
+        if self.stress is None or not self.stress.is_alive():
             print("Stress test is not active.")
             return
-        self.stress_event.set()
-        self.stress_thread.join(timeout=5)
+        self.stress.stop()
         print("Stress test stopped.")
 
     def stress_report(self):
-        with self.stress_lock:
-            gen = self.stress_stats.get("generated",0)
-            acc = self.stress_stats.get("accepted",0)
-            blk = self.stress_stats.get("blocked",0)
-            total_dur = self.stress_stats.get("total_duration",0.0)
+        if self.stress is None:
+            print("No stress test has been run.")
+            return
+        with self.stress.lock:
+            gen = self.stress.stats.get("generated",0)
+            acc = self.stress.stats.get("accepted",0)
+            blk = self.stress.stats.get("blocked",0)
+            total_dur = self.stress.stats.get("total_duration",0.0)
         avg_dur = (total_dur/acc) if acc>0 else 0.0
-        top5 = self.popularity_graph.top_n(5)
+        top5 = self.top_n(5)
         print("----- Stress test report -----")
         print("Generated:", gen)
         print("Accepted:", acc)
         print("Blocked:", blk)
         print("Average duration (s):", f"{avg_dur:.2f}")
+        print("Active time (s):", f"{self.stress.elapsed():.2f}")
+        print("Throughput (calls/s):", f"{self.stress.calls_per_second():.0f}")
+        with self.stress.lock:
+            latency = self.stress.latency
+            cost = self.stress.cost
+            pauses = self.stress.pauses
+            print(f"Ingest latency (ms, wall time of each call's batch, up to {self.stress.batch_size} calls):", "  ".join(f"p{p}={latency.percentile(p)/1e6:.2f}" for p in (50, 95, 99)), f" max={latency.max/1e6:.2f}")
+            print("Amortized ingest cost per call (us):", "  ".join(f"p{p}={cost.percentile(p)/1e3:.1f}" for p in (50, 95, 99)), f" max={cost.max/1e3:.1f}")
+            print("Hash-map resize/migration steps:", pauses.total, f" p99={pauses.percentile(99)/1e6:.2f} ms  max={pauses.max/1e6:.2f} ms")
+        growth = self.stress.memory_growth()
+        if growth is not None:
+            print(f"Memory growth per {MEMORY_EVERY:,} calls: heap {memory.mb(growth[0]):+.1f} MB (estimated), RSS {memory.mb(growth[1]):+.1f} MB")
+        curve = self.stress.throughput()
+        if curve:
+            print("Calls per second:")
+            for i in range(0, len(curve), 10):
+                print("  " + " ".join(f"{row[1]:>6}" for row in curve[i:i + 10]))
         print("Top 5 most popular (score):")
         for i,(num,score) in enumerate(top5, start=1):
             print(f"{i}) {self.nice_entry(num)} -> score={score:.2f}")
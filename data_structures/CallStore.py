@@ -0,0 +1,215 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from data_structures.ProbeHashMap import ProbeHashMap
+from data_structures.NumberTable import NumberTable
+import memory
+
+COLUMNS = (("caller", "i"), ("callee", "i"), ("start", "q"), ("duration", "i"))
+
+class CallStore:
+    def __init__(self, numbers=None):
+        self.numbers = numbers if numbers is not None else NumberTable()
+        self.caller = array('i')
+        self.callee = array('i')
+        self.start = array('q')
+        self.duration = array('i')
+        self.by_number = []
+        self.by_pair = ProbeHashMap(incremental=True)
+        self._base = None
+        self._unsorted_numbers = set()
+        self._unsorted_pairs = set()
+    def __len__(self):
+        return len(self.caller)
+    def object_count(self):
+        return len(self)
+    def memory_usage(self):
+        columns = (self.caller, self.callee, self.start, self.duration)
+        by_number = self.by_number
+        heap = (sum(memory.getsizeof(c) for c in columns if not isinstance(c, memoryview)) + memory.getsizeof(by_number)
+                + memory.sampled(by_number, lambda p: memory.getsizeof(p) if p is not None else 0))
+        return heap, memory.mapped(*columns) + (memory.mapped(*self._base) if self._base is not None else 0)
+    @staticmethod
+    def pair_key(id1, id2):
+        if id1 > id2:
+            id1, id2 = id2, id1
+        return (id1 << 32) | id2
+    def _writable(self):
+        if isinstance(self.caller, memoryview):
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.frombytes(getattr(self, name).cast('B'))
+                setattr(self, name, column)
+    def extend(self, rows):
+        self._writable()
+        first = len(self.caller)
+        self.start.extend([r[2] for r in rows])
+        self.duration.extend([r[3] for r in rows])
+        number_id = self.numbers.intern
+        post_number = self._post_number
+        post_pair = self._post_pair
+        pair_key = self.pair_key
+        callers = []
+        callees = []
+        row = first
+        for caller_number, callee_number, secs, _ in rows:
+            a = number_id(caller_number)
+            b = number_id(callee_number)
+            callers.append(a)
+            callees.append(b)
+            post_number(a, row, secs)
+            if b != a:
+                post_number(b, row, secs)
+            post_pair(pair_key(a, b), row, secs)
+            row += 1
+        self.caller.extend(callers)
+        self.callee.extend(callees)
+        return first
+    def _post_number(self, nid, row, secs):
+        by_number = self.by_number
+        if nid >= len(by_number):
+            by_number.extend([None] * (len(self.numbers) - len(by_number)))
+        posting = by_number[nid]
+        if posting is None and self._base is not None:
+            posting = by_number[nid] = array('i', self._base_number_rows(nid))
+        if not posting:
+            by_number[nid] = array('i', (row,))
+        else:
+            if self.start[posting[-1]] > secs:
+                self._unsorted_numbers.add(nid)
+            posting.append(row)
+    def _post_pair(self, key, row, secs):
+        by_pair = self.by_pair
+        posting = by_pair.get(key)
+        if posting is None and self._base is not None:
+            base = self._base_pair_rows(key)
+            if len(base):
+                posting = by_pair[key] = array('i', base)
+        if posting is None:
+            by_pair[key] = row
+        elif isinstance(posting, int):
+            by_pair[key] = array('i', (posting, row))
+            if self.start[posting] > secs:
+                self._unsorted_pairs.add(key)
+        else:
+            if self.start[posting[-1]] > secs:
+                self._unsorted_pairs.add(key)
+            posting.append(row)
+    @staticmethod
+    def _rows(posting):
+        if posting is None:
+            return ()
+        if isinstance(posting, int):
+            return (posting,)
+        return posting
+    def _by_time(self, rows):
+        return array('i', sorted(rows, key=self.start.__getitem__))
+    def _base_number_rows(self, nid):
+        offsets, rows = self._base[0], self._base[1]
+        if nid + 1 >= len(offsets):
+            return ()
+        return rows[offsets[nid]:offsets[nid + 1]]
+    def _base_pair_rows(self, key):
+        _, _, keys, offsets, rows = self._base
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return ()
+        return rows[offsets[i]:offsets[i + 1]]
+    def tidy(self):
+        by_number = self.by_number
+        for nid in self._unsorted_numbers:
+            by_number[nid] = self._by_time(by_number[nid])
+        by_pair = self.by_pair
+        for key in self._unsorted_pairs:
+            by_pair[key] = self._by_time(by_pair[key])
+        self._unsorted_numbers = set()
+        self._unsorted_pairs = set()
+    def rows_for_id(self, nid):
+        if nid is None:
+            return ()
+        posting = self.by_number[nid] if nid < len(self.by_number) else None
+        if posting is None:
+            return self._base_number_rows(nid) if self._base is not None else ()
+        if nid in self._unsorted_numbers:
+            return self._by_time(posting)
+        return posting
+    def _pair_rows(self, key):
+        posting = self.by_pair.get(key)
+        if posting is None:
+            return self._base_pair_rows(key) if self._base is not None else ()
+        if key in self._unsorted_pairs:
+            return self._by_time(self._rows(posting))
+        return self._rows(posting)
+    def rows_for_ids(self, id1, id2):
+        if id1 is None or id2 is None:
+            return ()
+        return self._pair_rows(self.pair_key(id1, id2))
+    def page(self, rows, start=None, end=None, limit=None, cursor=None):
+        starts = self.start
+        key = lambda row: (starts[row], row)
+        lo = 0 if start is None else bisect_left(rows, (start, -1), key=key)
+        hi = len(rows) if end is None else bisect_left(rows, (end, -1), key=key)
+        if cursor is not None:
+            lo = max(lo, bisect_right(rows, tuple(cursor), key=key))
+        stop = hi if limit is None else min(hi, lo + limit)
+        page = list(rows[lo:stop])
+        return page, (key(page[-1]) if page and stop < hi else None)
+    def history(self, nid, start=None, end=None, limit=None, cursor=None):
+        return self.page(self.rows_for_id(nid), start, end, limit, cursor)
+    def pair_history(self, id1, id2, start=None, end=None, limit=None, cursor=None):
+        return self.page(self.rows_for_ids(id1, id2), start, end, limit, cursor)
+    def row(self, i):
+        numbers = self.numbers.numbers
+        return (numbers[self.caller[i]], numbers[self.callee[i]], self.start[i], self.duration[i])
+    def __iter__(self):
+        numbers = self.numbers.numbers
+        for a, b, s, d in zip(self.caller, self.callee, self.start, self.duration):
+            yield (numbers[a], numbers[b], s, d)
+    def write_sections(self, writer):
+        for name, _ in COLUMNS:
+            writer.add("calls." + name, getattr(self, name))
+        offsets = array('q', [0])
+        rows = array('i')
+        for nid in range(len(self.numbers)):
+            rows.extend(self.rows_for_id(nid))
+            offsets.append(len(rows))
+        writer.add("calls.number_offsets", offsets)
+        writer.add("calls.number_rows", rows)
+        if self._base is not None and not len(self.by_pair):
+            _, _, keys, offsets, rows = self._base
+        else:
+            pair_keys = set(self.by_pair.keys())
+            if self._base is not None:
+                pair_keys.update(self._base[2])
+            keys = array('q', sorted(pair_keys))
+            offsets = array('q', [0])
+            rows = array('i')
+            pair_rows = self._pair_rows
+            for key in keys:
+                rows.extend(pair_rows(key))
+                offsets.append(len(rows))
+        writer.add("calls.pair_keys", keys)
+        writer.add("calls.pair_offsets", offsets)
+        writer.add("calls.pair_rows", rows)
+    def write_delta_sections(self, writer, first_row):
+        for name, _ in COLUMNS:
+            writer.add("calls." + name, getattr(self, name)[first_row:])
+    def apply_delta(self, snapshot):
+        numbers = self.numbers.numbers
+        self.extend([(numbers[a], numbers[b], start, duration) for a, b, start, duration in
+                     zip(snapshot["calls.caller"], snapshot["calls.callee"], snapshot["calls.start"], snapshot["calls.duration"])])
+    def attach(self, snapshot):
+        self.clear()
+        for name, _ in COLUMNS:
+            setattr(self, name, snapshot["calls." + name])
+        self._base = (snapshot["calls.number_offsets"], snapshot["calls.number_rows"],
+                      snapshot["calls.pair_keys"], snapshot["calls.pair_offsets"], snapshot["calls.pair_rows"])
+    def clear(self):
+        self.caller = array('i')
+        self.callee = array('i')
+        self.start = array('q')
+        self.duration = array('i')
+        self.by_number = []
+        self.by_pair.clear()
+        self._base = None
+        self._unsorted_numbers = set()
+        self._unsorted_pairs = set()
@@ -1,5 +1,6 @@
 from collections.abc import MutableMapping
 from random import randrange
+from time import perf_counter
 
 class MapBase(MutableMapping):
     class Item:
@@ -44,34 +45,102 @@ class UnsortedTableMap(MapBase):
             yield (item.key, item.value)
 
 class HashMapBase(MapBase):
-    def __init__(self, cap=11, p=109245121):
+    def __init__(self, cap=11, p=109245121, incremental=False, migrate_step=4):
         self.table = cap * [None]
         self.n = 0
         self.prime = p
         self.scale = 1 + randrange(p - 1)
         self.shift = randrange(p)
+        self._init_resizing(incremental, migrate_step)
+    def _init_resizing(self, incremental, migrate_step):
+        self.incremental = incremental
+        self.migrate_step = migrate_step
+        self._old = None
+        self._old_pos = 0
+        self.max_pause = 0.0
+        self.pause_hook = None
     def hash_function(self, k):
         return (hash(k) * self.scale + self.shift) % self.prime % len(self.table)
     def __len__(self):
+        if self._old is not None:
+            return self.n + self._old.n
         return self.n
     def __getitem__(self, k):
         j = self.hash_function(k)
-        return self.bucket_getitem(j, k)
+        try:
+            return self.bucket_getitem(j, k)
+        except KeyError:
+            if self._old is None:
+                raise
+        return self._old[k]
     def __setitem__(self, k, v):
+        if self._old is not None and k in self._old:
+            del self._old[k]
         j = self.hash_function(k)
         self.bucket_setitem(j, k, v)
+        if self._old is not None:
+            self._timed(self._migrate, self.migrate_step)
         if self.n > len(self.table) // 2:
-            self.resize(2 * len(self.table) - 1)
+            self._timed(self.resize, 2 * len(self.table) - 1)
     def __delitem__(self, k):
         j = self.hash_function(k)
-        self.bucket_delitem(j, k)
-        self.n -= 1
+        try:
+            self.bucket_delitem(j, k)
+            self.n -= 1
+        except KeyError:
+            if self._old is None:
+                raise
+            del self._old[k]
+        if self._old is not None:
+            self._timed(self._migrate, self.migrate_step)
+    def _timed(self, fn, arg):
+        start = perf_counter()
+        fn(arg)
+        pause = perf_counter() - start
+        if pause > self.max_pause:
+            self.max_pause = pause
+        if self.pause_hook is not None:
+            self.pause_hook(pause)
     def resize(self, c):
+        if self.incremental:
+            if self._old is not None:
+                self._migrate(None)
+            self._old = self._detach()
+            self._old_pos = 0
+            self._alloc_table(c)
+            self._migrate(self.migrate_step)
+            return
         old = list(self.items())
+        self._alloc_table(c)
+        for (k, v) in old:
+            self._raw_insert(k, v)
+    def _detach(self):
+        old = object.__new__(type(self))
+        old.__dict__.update(self.__dict__)
+        old.incremental = False
+        old._old = None
+        old.pause_hook = None
+        return old
+    def _migrate(self, steps=None):
+        old = self._old
+        end = old._bucket_count()
+        pos = self._old_pos
+        stop = end if steps is None else min(end, pos + steps)
+        insert = self._raw_insert
+        while pos < stop:
+            for k, v in old._drain_bucket(pos):
+                insert(k, v)
+            pos += 1
+        self._old_pos = pos
+        if pos >= end:
+            self._old = None
+    def _alloc_table(self, c):
         self.table = c * [None]
         self.n = 0
-        for (k, v) in old:
-            self[k] = v
+    def _bucket_count(self):
+        return len(self.table)
+    def _raw_insert(self, k, v):
+        self.bucket_setitem(self.hash_function(k), k, v)
 
 class ChainHashMap(HashMapBase):
     def bucket_getitem(self, j, k):
@@ -91,11 +160,20 @@ class ChainHashMap(HashMapBase):
         if bucket is None:
             raise KeyError(f"Key Error: {k}")
         del bucket[k]
+    def _drain_bucket(self, j):
+        bucket = self.table[j]
+        if bucket is None:
+            return ()
+        self.table[j] = None
+        self.n -= len(bucket)
+        return list(bucket.items())
     def __iter__(self):
         for bucket in self.table:
             if bucket is not None:
                 for key in bucket:
                     yield key
+        if self._old is not None:
+            yield from self._old
     def __contains__(self, key):
         try:
             _ = self[key]
@@ -123,6 +201,7 @@ class ChainHashMap(HashMapBase):
     def clear(self):
         self.table = [None] * len(self.table)
         self.n = 0
+        self._old = None
     def __repr__(self):
         pairs = [f"{k}: {self[k]!r}" for k in self]
         return "{" + ", ".join(pairs) + "}"
@@ -0,0 +1,124 @@
+from heapq import nsmallest
+import memory
+
+MAX_DISTANCE = 2
+LEAD = 1
+MAX_DIGITS = 64
+_NIBBLES = int("1" * MAX_DIGITS, 16)
+
+def digits(number):
+    return "".join(ch for ch in number if "0" <= ch <= "9")[:MAX_DIGITS]
+
+def encode(number_digits):
+    code = 0
+    for i, ch in enumerate(number_digits):
+        code |= (ord(ch) - 47) << (4 * i)
+    return code
+
+def fold(x):
+    return (x | x >> 1 | x >> 2 | x >> 3) & _NIBBLES
+
+def distance(a, b):
+    return fold(a ^ b).bit_count()
+
+def shift_distance(a, b, length):
+    s = fold(a ^ b)
+    e = fold(a ^ (b >> 4)) if b >> (4 * length) else fold((a >> 4) ^ b)
+    return 1 + min((s & ((1 << (4 * p)) - 1)).bit_count() + (e >> (4 * p)).bit_count() for p in range(length + 1))
+
+class DigitIndex:
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.segments = max_distance + 1
+        self.codes = {}
+        self.groups = {}
+        self.short = []
+        self._bounds = {}
+        self._usage = None
+    def __len__(self):
+        return len(self.codes)
+    def __contains__(self, nid):
+        return nid in self.codes
+    def object_count(self):
+        return len(self.codes)
+    def memory_usage(self):
+        if self._usage is None or self._usage[0] != len(self.codes):
+            self._usage = (len(self.codes), memory.heap(self.codes) + memory.heap(self.groups) + memory.heap(self.short))
+        return self._usage[1], 0
+    def bounds(self, length):
+        b = self._bounds.get(length)
+        if b is None:
+            s = self.segments
+            rest = length - LEAD
+            b = self._bounds[length] = [(0 if j == 0 else LEAD + rest * j // s, LEAD + rest * (j + 1) // s) for j in range(s)]
+        return b
+    @staticmethod
+    def _key(code, lo, hi):
+        return (code >> (4 * lo)) & ((1 << (4 * (hi - lo))) - 1)
+    def add(self, nid, number):
+        if nid in self.codes:
+            return
+        d = digits(number)
+        code = self.codes[nid] = encode(d)
+        length = len(d)
+        if length - LEAD < self.segments:
+            self.short.append((length, nid))
+            return
+        tables = self.groups.get(length)
+        if tables is None:
+            tables = self.groups[length] = [{} for _ in range(self.segments)]
+        key = self._key
+        for table, (lo, hi) in zip(tables, self.bounds(length)):
+            table.setdefault(key(code, lo, hi), []).append(nid)
+    def candidates(self, code, length):
+        r = self.max_distance
+        found = {nid for l, nid in self.short if abs(l - length) <= r}
+        key = self._key
+        for l, tables in self.groups.items():
+            if abs(l - length) > r:
+                continue
+            q = code & ((1 << (4 * l)) - 1)
+            for table, (lo, hi) in zip(tables, self.bounds(l)):
+                posting = table.get(key(q, lo, hi))
+                if posting:
+                    found.update(posting)
+        return found
+    def _probe(self, number_digits, best):
+        code = encode(number_digits)
+        codes = self.codes
+        r = self.max_distance
+        within = 0
+        for nid in self.candidates(code, len(number_digits)):
+            dist = best[nid] = distance(code, codes[nid])
+            within += dist <= r
+        return within
+    def _shifted(self, number_digits, best):
+        length = len(number_digits)
+        key = self._key
+        head = encode(number_digits)
+        found = set()
+        for l, tail in ((length + 1, "0" + number_digits), (length - 1, number_digits[1:])):
+            tables = self.groups.get(l)
+            if tables is None:
+                continue
+            bounds = self.bounds(l)
+            for code, table, (lo, hi) in ((head, tables[0], bounds[0]), (encode(tail), tables[-1], bounds[-1])):
+                posting = table.get(key(code, lo, hi))
+                if posting:
+                    found.update(posting)
+        codes = self.codes
+        for nid in found:
+            dist = shift_distance(head, codes[nid], length)
+            if dist < best.get(nid, dist + 1):
+                best[nid] = dist
+    def nearest(self, number, n=5):
+        d = digits(number)
+        if not d or n <= 0:
+            return []
+        best = {}
+        if self._probe(d, best) < n:
+            self._shifted(d, best)
+        if not best:
+            code = encode(d)
+            best = {nid: distance(code, c) for nid, c in self.codes.items()}
+        return nsmallest(n, ((dist, nid) for nid, dist in best.items()))
@@ -0,0 +1,49 @@
+SUB_BITS = 5
+
+class LatencyHistogram:
+    def __init__(self, sub_bits=SUB_BITS):
+        self.sub_bits = sub_bits
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+    def __len__(self):
+        return self.total
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self.sub_bits)
+        return (shift << self.sub_bits) + (value >> shift)
+    def bounds(self, index):
+        shift = index >> self.sub_bits
+        low = (index & ((1 << self.sub_bits) - 1)) << shift if shift else index
+        return low, low + (1 << shift) - 1
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        i = self._index(value)
+        self.counts[i] = self.counts.get(i, 0) + count
+        self.total += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        target = max(1, -(-self.total * p // 100))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= target:
+                return min(self.bounds(i)[1], self.max)
+        return self.max
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+    def buckets(self):
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            low, high = self.bounds(i)
+            yield low, high, self.counts[i], seen / self.total
+    def clear(self):
+        self.__init__(self.sub_bits)
@@ -0,0 +1,77 @@
+from bisect import bisect_left, insort
+from itertools import chain, islice
+import memory
+
+class Leaderboard:
+    LOAD = 256
+    def __init__(self):
+        self._lists = []
+        self._maxes = []
+        self._keys = {}
+    def __len__(self):
+        return len(self._keys)
+    def __contains__(self, nid):
+        return nid in self._keys
+    def object_count(self):
+        return len(self._keys)
+    def memory_usage(self):
+        return memory.heap(self._keys) + memory.getsizeof(self._lists) + sum(memory.getsizeof(lst) for lst in self._lists), 0
+    def score(self, nid):
+        key = self._keys.get(nid)
+        return -key[0] if key is not None else 0
+    def update(self, nid, score):
+        key = (-score, nid)
+        old = self._keys.get(nid)
+        if old == key:
+            return
+        if old is not None:
+            self._remove(old)
+        self._keys[nid] = key
+        self._insert(key)
+    def build(self, scores):
+        keys = sorted((-score, nid) for nid, score in scores)
+        self._keys = {key[1]: key for key in keys}
+        load = self.LOAD
+        self._lists = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [lst[-1] for lst in self._lists]
+    def _insert(self, key):
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([key])
+            maxes.append(key)
+            return
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            i -= 1
+            self._lists[i].append(key)
+            maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        lst = self._lists[i]
+        if len(lst) > 2 * self.LOAD:
+            half = lst[self.LOAD:]
+            del lst[self.LOAD:]
+            maxes[i] = lst[-1]
+            self._lists.insert(i + 1, half)
+            maxes.insert(i + 1, half[-1])
+    def _remove(self, key):
+        i = bisect_left(self._maxes, key)
+        lst = self._lists[i]
+        del lst[bisect_left(lst, key)]
+        if lst:
+            self._maxes[i] = lst[-1]
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+    def rank(self, nid):
+        key = self._keys.get(nid)
+        if key is None:
+            return None
+        i = bisect_left(self._maxes, key)
+        return sum(map(len, self._lists[:i])) + bisect_left(self._lists[i], key) + 1
+    def top(self, n):
+        return [(nid, -neg) for neg, nid in islice(chain.from_iterable(self._lists), n)]
+    def clear(self):
+        self._lists = []
+        self._maxes = []
+        self._keys = {}
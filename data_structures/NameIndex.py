@@ -0,0 +1,116 @@
+from heapq import nsmallest
+import memory
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+def deletes(word, max_distance):
+    found = {word}
+    frontier = found
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        best = i
+        for j, cb in enumerate(b, 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, before[j - 2] + 1)
+            cur.append(d)
+            if d < best:
+                best = d
+        if best > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+class NameIndex:
+    FIRST = 0
+    LAST = 1
+    def __init__(self, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms = []
+        self.term_ids = {}
+        self.entries = []
+        self.deletes = {}
+        self._usage = None
+    def __len__(self):
+        return len(self.terms)
+    def object_count(self):
+        return len(self.deletes)
+    def memory_usage(self):
+        if self._usage is None or self._usage[0] != len(self.entries):
+            self._usage = (len(self.entries), sum(memory.heap(part) for part in (self.terms, self.term_ids, self.entries, self.deletes)))
+        return self._usage[1], 0
+    def _term(self, term):
+        tid = self.term_ids.get(term)
+        if tid is None:
+            tid = self.term_ids[term] = len(self.terms)
+            self.terms.append(term)
+            self.entries.append((set(), set()))
+            index = self.deletes
+            for variant in deletes(term[:self.prefix_length], self.max_distance):
+                posting = index.get(variant)
+                if posting is None:
+                    index[variant] = tid
+                elif isinstance(posting, int):
+                    index[variant] = [posting, tid]
+                else:
+                    posting.append(tid)
+        return tid
+    def add(self, nid, first_name, last_name):
+        if first_name:
+            self.entries[self._term(first_name.lower())][self.FIRST].add(nid)
+        if last_name:
+            self.entries[self._term(last_name.lower())][self.LAST].add(nid)
+    def lookup(self, term):
+        term = term.lower()
+        limit = self.max_distance
+        index = self.deletes
+        candidates = set()
+        for variant in deletes(term[:self.prefix_length], limit):
+            posting = index.get(variant)
+            if posting is None:
+                continue
+            if isinstance(posting, int):
+                candidates.add(posting)
+            else:
+                candidates.update(posting)
+        terms = self.terms
+        found = []
+        for tid in candidates:
+            d = edit_distance(term, terms[tid], limit)
+            if d <= limit:
+                found.append((d, tid))
+        return found
+    def _matches(self, term, role):
+        best = {}
+        for d, tid in self.lookup(term):
+            for nid in self.entries[tid][role]:
+                if d < best.get(nid, d + 1):
+                    best[nid] = d
+        return best
+    def nearest(self, name, n=5):
+        tokens = name.split()
+        if not tokens or n <= 0:
+            return []
+        if len(tokens) == 1:
+            best = self._matches(tokens[0], self.FIRST)
+            for nid, d in self._matches(tokens[0], self.LAST).items():
+                if d < best.get(nid, d + 1):
+                    best[nid] = d
+            return nsmallest(n, ((d, nid) for nid, d in best.items()))
+        first = self._matches(tokens[0], self.FIRST)
+        last = self._matches(tokens[-1], self.LAST)
+        if len(first) > len(last):
+            first, last = last, first
+        return nsmallest(n, ((d + last[nid], nid) for nid, d in first.items() if nid in last))
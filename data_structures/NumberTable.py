@@ -0,0 +1,33 @@
+import memory
+
+class NumberTable:
+    def __init__(self):
+        self.numbers = []
+        self.ids = {}
+    def intern(self, number):
+        nid = self.ids.get(number)
+        if nid is None:
+            nid = len(self.numbers)
+            self.ids[number] = nid
+            self.numbers.append(number)
+        return nid
+    def get(self, number, default=None):
+        return self.ids.get(number, default)
+    def __getitem__(self, nid):
+        return self.numbers[nid]
+    def __contains__(self, number):
+        return number in self.ids
+    def __len__(self):
+        return len(self.numbers)
+    def __iter__(self):
+        return iter(self.numbers)
+    def object_count(self):
+        return len(self.numbers)
+    def memory_usage(self):
+        return memory.heap(self.numbers) + memory.getsizeof(self.ids) + memory.getsizeof(1 << 40) * len(self.numbers), 0
+    def load(self, numbers):
+        self.numbers = list(numbers)
+        self.ids = {number: nid for nid, number in enumerate(self.numbers)}
+    def clear(self):
+        self.numbers = []
+        self.ids = {}
@@ -1,3 +1,8 @@
+from array import array
+from bisect import bisect_left
+from data_structures.Leaderboard import Leaderboard
+import memory
+
 class Graph:
     class Vertex:
         __slots__ = '_element'
@@ -5,8 +10,6 @@ class Graph:
             self._element = x
         def element(self):
             return self._element
-        def __hash__(self):
-            return hash(id(self))
         def __str__(self):
             return str(self._element)
     class Edge:
@@ -39,6 +42,18 @@ class Graph:
             raise TypeError('Očekivan je objekat klase Vertex')
         if v not in self._outgoing:
             raise ValueError('Vertex ne pripada ovom grafu.')
+    def object_count(self):
+        n = len(self._outgoing)
+        return n + memory.sampled(self._outgoing.values(), len, n)
+    def memory_usage(self):
+        n = len(self._outgoing)
+        def adjacency(out):
+            return memory.getsizeof(out) + sum(memory.getsizeof(e) + memory.heap(e._element) for e in out.values())
+        size = memory.getsizeof(self._outgoing) + memory.sampled(self._outgoing.keys(), memory.getsizeof, n)
+        size += memory.sampled(self._outgoing.values(), adjacency, n)
+        if self.is_directed():
+            size += memory.getsizeof(self._incoming) + memory.sampled(self._incoming.values(), memory.getsizeof, n)
+        return size, 0
     def is_directed(self):
         return self._incoming is not self._outgoing
     def vertex_count(self):
@@ -80,30 +95,93 @@ class Graph:
         self._incoming[v][u] = e
 
 class PopularityGraph:
-    def __init__(self):
+    def __init__(self, numbers=None):
+        self.numbers = numbers
         self.graph = Graph(directed=True)
         self.vertex_map = {}
         self.received_count = {}
         self.received_duration = {}
-    def _get_or_create_vertex(self, number):
-        if number not in self.vertex_map:
-            v = self.graph.insert_vertex(number)
-            self.vertex_map[number] = v
-        return self.vertex_map[number]
-    def record_call(self, caller_number, callee_number, duration_time):
-        if not caller_number or not callee_number:
+        self.scores = {}
+        self.leaderboard = Leaderboard()
+        self._dirty = set()
+        self._base = None
+        self._base_delta = {}
+    def object_count(self):
+        return len(self.scores)
+    def memory_usage(self):
+        heap = (memory.getsizeof(self.vertex_map) + memory.heap(self.scores) + memory.heap(self.received_count)
+                + memory.heap(self.received_duration) + memory.heap(self._base_delta))
+        if self._base is None:
+            return heap, 0
+        return heap + sum(memory.getsizeof(a) for a in self._base if not isinstance(a, memoryview)), memory.mapped(*self._base)
+    def _get_or_create_vertex(self, nid):
+        v = self.vertex_map.get(nid)
+        if v is None:
+            v = self.graph.insert_vertex(nid)
+            self.vertex_map[nid] = v
+        return v
+    def _label(self, nid):
+        return self.numbers[nid] if self.numbers is not None else nid
+    def record_call(self, caller_id, callee_id, duration_time):
+        if caller_id is None or callee_id is None:
             return
-        v1 = self._get_or_create_vertex(caller_number)
-        v2 = self._get_or_create_vertex(callee_number)
+        if self._base is not None and self._record_base(caller_id, callee_id, duration_time):
+            return
+        v1 = self._get_or_create_vertex(caller_id)
+        v2 = self._get_or_create_vertex(callee_id)
         edge = self.graph.get_edge(v1, v2)
+        scores = self.scores
         if edge is None:
             self.graph.insert_edge(v1, v2, {"count": 1, "duration": duration_time})
+            scores[caller_id] = scores.get(caller_id, 0.0) + 100 + 0.5 * duration_time
+            scores[callee_id] = scores.get(callee_id, 0.0) + 200 + duration_time
         else:
             e = edge.element()
             e["count"] += 1
             e["duration"] += duration_time
-        self.received_count[callee_number] = self.received_count.get(callee_number, 0) + 1
-        self.received_duration[callee_number] = self.received_duration.get(callee_number, 0.0) + duration_time
+            scores[caller_id] = scores.get(caller_id, 0.0) + 0.5 * duration_time
+            scores[callee_id] = scores.get(callee_id, 0.0) + duration_time
+        self._dirty.add(caller_id)
+        self._dirty.add(callee_id)
+        self.received_count[callee_id] = self.received_count.get(callee_id, 0) + 1
+        self.received_duration[callee_id] = self.received_duration.get(callee_id, 0.0) + duration_time
+    def _in_base(self, key):
+        keys = self._base[0]
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+    def _record_base(self, caller_id, callee_id, duration_time):
+        key = (caller_id << 32) | callee_id
+        delta = self._base_delta.get(key)
+        if delta is None:
+            if not self._in_base(key):
+                return False
+            self._base_delta[key] = [1, duration_time]
+        else:
+            delta[0] += 1
+            delta[1] += duration_time
+        scores = self.scores
+        scores[caller_id] = scores.get(caller_id, 0.0) + 0.5 * duration_time
+        scores[callee_id] = scores.get(callee_id, 0.0) + duration_time
+        self._dirty.add(caller_id)
+        self._dirty.add(callee_id)
+        self.received_count[callee_id] = self.received_count.get(callee_id, 0) + 1
+        self.received_duration[callee_id] = self.received_duration.get(callee_id, 0.0) + duration_time
+        return True
+    def _materialize(self):
+        if self._base is None:
+            return
+        keys, counts, durations = self._base
+        delta = self._base_delta
+        get_vertex = self._get_or_create_vertex
+        insert_edge = self.graph.insert_edge
+        for key, count, duration in zip(keys, counts, durations):
+            extra = delta.get(key)
+            if extra is not None:
+                count += extra[0]
+                duration += extra[1]
+            insert_edge(get_vertex(key >> 32), get_vertex(key & 0xFFFFFFFF), {"count": count, "duration": duration})
+        self._base = None
+        self._base_delta = {}
     #def get_score(self, number): 
     #    c = self.received_count.get(number, 0) 
     #    d = self.received_duration.get(number, 0.0) 
@@ -112,52 +190,134 @@ class PopularityGraph:
     #    scores = [(num, self.get_score(num)) for num in self.received_count] 
     #    scores.sort(key=lambda x: x[1], reverse=True) 
     #    return scores[:n]
-    def get_score(self, number):
-        if number not in self.vertex_map:
-            return 0
-        v = self.vertex_map[number]
-        in_degree = self.graph.degree(v, outgoing=False)
-        out_degree = self.graph.degree(v, outgoing=True)
-        in_duration = 0.0
-        for edge in self.graph.incident_edges(v, outgoing=False):
-            in_duration += edge.element()["duration"]
-        out_duration = 0.0
-        for edge in self.graph.incident_edges(v, outgoing=True):
-            out_duration += edge.element()["duration"]
-        score = (in_degree * 2 + out_degree) * 100 + (in_duration + 0.5 * out_duration)
-        return score
+    def get_score(self, nid):
+        return self.scores.get(nid, 0)
+    def sync(self):
+        dirty = self._dirty
+        if not dirty:
+            return
+        scores = self.scores
+        if len(dirty) * 4 > len(scores):
+            self.leaderboard.build(scores.items())
+        else:
+            update = self.leaderboard.update
+            for nid in dirty:
+                update(nid, scores[nid])
+        self._dirty = set()
     def top_n(self, n=10):
-        scores = [(num, self.get_score(num)) for num in self.vertex_map]
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:n]
-    def serialize(self):
-        data = {"graph": {}, "received_count": self.received_count, "received_duration": self.received_duration}
-        for edge in self.graph.edges():
-            u, v = edge.endpoints()
-            u_num = u.element()
-            v_num = v.element()
-            e_data = edge.element()
-            if u_num not in data["graph"]:
-                data["graph"][u_num] = {}
-            data["graph"][u_num][v_num] = {"count": e_data["count"], "duration": e_data["duration"]}
-        return data
-    def deserialize(self, obj):
-        self.graph = Graph(directed=True)
-        self.vertex_map.clear()
-        self.received_count = obj.get("received_count", {})
-        self.received_duration = obj.get("received_duration", {})
-        for caller, callees in obj.get("graph", {}).items():
-            v1 = self._get_or_create_vertex(caller)
-            for callee, info in callees.items():
-                v2 = self._get_or_create_vertex(callee)
-                self.graph.insert_edge(v1, v2, {"count": int(info["count"]), "duration": float(info["duration"])})
-    def show_all(self):
+        return self.leaderboard.top(n)
+    def rank(self, nid):
+        return self.leaderboard.rank(nid)
+    def edge_rows(self):
+        rows = []
+        if self._base is not None:
+            delta = self._base_delta
+            for key, count, duration in zip(*self._base):
+                extra = delta.get(key)
+                if extra is not None:
+                    count += extra[0]
+                    duration += extra[1]
+                rows.append((key >> 32, key & 0xFFFFFFFF, count, duration))
         for edge in self.graph.edges():
             u, v = edge.endpoints()
             d = edge.element()
-            print(f"{u.element()} -> {v.element()} | count={d['count']}, duration={d['duration']}")
+            rows.append((u.element(), v.element(), d["count"], d["duration"]))
+        return rows
+    def show_all(self, rows=None):
+        label = self._label
+        for u, v, count, duration in self.edge_rows() if rows is None else rows:
+            print(f"{label(u)} -> {label(v)} | count={count}, duration={duration}")
     def clear(self):
         self.graph = Graph(directed=True)
         self.vertex_map.clear()
         self.received_count.clear()
         self.received_duration.clear()
+        self.scores = {}
+        self.leaderboard.clear()
+        self._dirty = set()
+        self._base = None
+        self._base_delta = {}
+    def write_sections(self, writer):
+        if self._base is not None and not self._base_delta and not self.vertex_map:
+            keys, counts, durations = self._base
+        else:
+            edges = {}
+            if self._base is not None:
+                delta = self._base_delta
+                for key, count, duration in zip(*self._base):
+                    extra = delta.get(key)
+                    edges[key] = (count + extra[0], duration + extra[1]) if extra is not None else (count, duration)
+            for edge in self.graph.edges():
+                u, v = edge.endpoints()
+                e = edge.element()
+                edges[(u.element() << 32) | v.element()] = (e["count"], e["duration"])
+            keys = array('q', sorted(edges))
+            counts = array('q', [edges[key][0] for key in keys])
+            durations = array('d', [edges[key][1] for key in keys])
+        writer.add("graph.edge_keys", keys)
+        writer.add("graph.edge_counts", counts)
+        writer.add("graph.edge_durations", durations)
+        writer.add("graph.score_ids", array('i', self.scores.keys()))
+        writer.add("graph.score_values", array('d', self.scores.values()))
+        writer.add("graph.received_ids", array('i', self.received_count.keys()))
+        writer.add("graph.received_counts", array('q', self.received_count.values()))
+        writer.add("graph.received_durations", array('d', [self.received_duration.get(nid, 0.0) for nid in self.received_count]))
+    def write_delta_sections(self, writer, store, first_row):
+        edges = {}
+        for a, b, d in zip(store.caller[first_row:], store.callee[first_row:], store.duration[first_row:]):
+            key = (a << 32) | b
+            edge = edges.get(key)
+            if edge is None:
+                edges[key] = [1, d]
+            else:
+                edge[0] += 1
+                edge[1] += d
+        keys = array('q', sorted(edges))
+        writer.add("graph.edge_keys", keys)
+        writer.add("graph.edge_counts", array('q', [edges[key][0] for key in keys]))
+        writer.add("graph.edge_durations", array('d', [edges[key][1] for key in keys]))
+    def apply_delta(self, snapshot):
+        scores = self.scores
+        received_count = self.received_count
+        received_duration = self.received_duration
+        dirty = self._dirty
+        for key, count, duration in zip(snapshot["graph.edge_keys"], snapshot["graph.edge_counts"], snapshot["graph.edge_durations"]):
+            caller_id = key >> 32
+            callee_id = key & 0xFFFFFFFF
+            new = False
+            if self._base is not None and self._in_base(key):
+                delta = self._base_delta.get(key)
+                if delta is None:
+                    self._base_delta[key] = [count, duration]
+                else:
+                    delta[0] += count
+                    delta[1] += duration
+            else:
+                v1 = self._get_or_create_vertex(caller_id)
+                v2 = self._get_or_create_vertex(callee_id)
+                edge = self.graph.get_edge(v1, v2)
+                if edge is None:
+                    self.graph.insert_edge(v1, v2, {"count": count, "duration": duration})
+                    new = True
+                else:
+                    e = edge.element()
+                    e["count"] += count
+                    e["duration"] += duration
+            scores[caller_id] = scores.get(caller_id, 0.0) + (100 if new else 0) + 0.5 * duration
+            scores[callee_id] = scores.get(callee_id, 0.0) + (200 if new else 0) + duration
+            dirty.add(caller_id)
+            dirty.add(callee_id)
+            received_count[callee_id] = received_count.get(callee_id, 0) + count
+            received_duration[callee_id] = received_duration.get(callee_id, 0.0) + duration
+    def attach(self, snapshot):
+        self.clear()
+        self._base = (snapshot["graph.edge_keys"], snapshot["graph.edge_counts"], snapshot["graph.edge_durations"])
+        self.scores = dict(zip(snapshot["graph.score_ids"], snapshot["graph.score_values"]))
+        received = snapshot["graph.received_ids"]
+        self.received_count = dict(zip(received, snapshot["graph.received_counts"]))
+        self.received_duration = dict(zip(received, snapshot["graph.received_durations"]))
+        self._dirty = set(self.scores)
+    def record_store(self, store, first_row=0):
+        record_call = self.record_call
+        for a, b, d in zip(store.caller[first_row:], store.callee[first_row:], store.duration[first_row:]):
+            record_call(a, b, d)
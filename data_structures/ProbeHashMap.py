@@ -0,0 +1,189 @@
+from itertools import islice
+from data_structures.ChainHashMap import HashMapBase
+import memory
+
+_FREE = object()
+_DELETED = object()
+_HASH_MASK = (1 << 64) - 1
+
+class ProbeHashMap(HashMapBase):
+    def __init__(self, cap=8, incremental=False, migrate_step=4):
+        self._alloc_table(cap)
+        self._init_resizing(incremental, migrate_step)
+    def _alloc_table(self, c):
+        size = 8
+        while size < c:
+            size <<= 1
+        self._alloc(size)
+        self.n = 0
+    def _alloc(self, size):
+        self._keys = [_FREE] * size
+        self._values = [None] * size
+        self._hashes = [0] * size
+        self._mask = size - 1
+        self._used = 0
+    def object_count(self):
+        return len(self)
+    def memory_usage(self, value_size=memory.getsizeof, key_size=memory.heap):
+        size = memory.getsizeof(self._keys) + memory.getsizeof(self._values) + memory.getsizeof(self._hashes)
+        live = list(islice(self.items(), memory.SAMPLE))
+        if live:
+            size += int(sum(key_size(k) + value_size(v) for k, v in live) / len(live) * len(self))
+        if self._old is not None:
+            old = self._old
+            size += memory.getsizeof(old._keys) + memory.getsizeof(old._values) + memory.getsizeof(old._hashes)
+        return size, 0
+    @classmethod
+    def from_items(cls, items, n=None):
+        if n is None:
+            items = list(items)
+            n = len(items)
+        m = cls(n * 3 // 2 + 1)
+        for k, v in items:
+            m._insert(k, v, hash(k) & _HASH_MASK)
+        return m
+    def _slot(self, k, h):
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._mask
+        i = h & mask
+        perturb = h
+        while True:
+            key = keys[i]
+            if key is _FREE:
+                return -1
+            if key is not _DELETED and hashes[i] == h and (key is k or key == k):
+                return i
+            perturb >>= 5
+            i = (i * 5 + perturb + 1) & mask
+    def _insert(self, k, v, h):
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._mask
+        i = h & mask
+        perturb = h
+        free = -1
+        while True:
+            key = keys[i]
+            if key is _FREE:
+                break
+            if key is _DELETED:
+                if free < 0:
+                    free = i
+            elif hashes[i] == h and (key is k or key == k):
+                self._values[i] = v
+                return False
+            perturb >>= 5
+            i = (i * 5 + perturb + 1) & mask
+        if free >= 0:
+            i = free
+        else:
+            self._used += 1
+        keys[i] = k
+        self._values[i] = v
+        hashes[i] = h
+        self.n += 1
+        return True
+    def __getitem__(self, k):
+        h = hash(k) & _HASH_MASK
+        i = h & self._mask
+        key = self._keys[i]
+        if key is not k and (key is _FREE or self._hashes[i] != h or key != k):
+            i = self._slot(k, h)
+            if i < 0:
+                if self._old is not None:
+                    return self._old[k]
+                raise KeyError(f"Key Error: {k}")
+        return self._values[i]
+    def __setitem__(self, k, v):
+        old = self._old
+        if old is not None and k in old:
+            del old[k]
+        if self._insert(k, v, hash(k) & _HASH_MASK):
+            if old is not None:
+                self._timed(self._migrate, self.migrate_step)
+            if 3 * self._used >= 2 * len(self._keys):
+                self._timed(self.resize, len(self) * 4)
+        elif old is not None:
+            self._timed(self._migrate, self.migrate_step)
+    def __delitem__(self, k):
+        i = self._slot(k, hash(k) & _HASH_MASK)
+        if i < 0:
+            if self._old is None:
+                raise KeyError(f"Key Error: {k}")
+            del self._old[k]
+        else:
+            self._keys[i] = _DELETED
+            self._values[i] = None
+            self.n -= 1
+        if self._old is not None:
+            self._timed(self._migrate, self.migrate_step)
+    def __contains__(self, k):
+        h = hash(k) & _HASH_MASK
+        i = h & self._mask
+        key = self._keys[i]
+        if key is k:
+            return True
+        if key is not _FREE and self._slot(k, h) >= 0:
+            return True
+        return self._old is not None and k in self._old
+    def get(self, k, default=None):
+        h = hash(k) & _HASH_MASK
+        i = h & self._mask
+        key = self._keys[i]
+        if key is not k:
+            if key is not _FREE:
+                i = self._slot(k, h)
+            if key is _FREE or i < 0:
+                if self._old is not None:
+                    return self._old.get(k, default)
+                return default
+        return self._values[i]
+    def setdefault(self, k, default=None):
+        h = hash(k) & _HASH_MASK
+        i = self._slot(k, h)
+        if i >= 0:
+            return self._values[i]
+        if self._old is not None and k in self._old:
+            return self._old[k]
+        self[k] = default
+        return default
+    def _bucket_count(self):
+        return len(self._keys)
+    def _drain_bucket(self, j):
+        k = self._keys[j]
+        if k is _FREE or k is _DELETED:
+            return ()
+        v = self._values[j]
+        self._keys[j] = _DELETED
+        self._values[j] = None
+        self.n -= 1
+        return ((k, v),)
+    def _raw_insert(self, k, v):
+        self._insert(k, v, hash(k) & _HASH_MASK)
+    def __iter__(self):
+        for k in self._keys:
+            if k is not _FREE and k is not _DELETED:
+                yield k
+        if self._old is not None:
+            yield from self._old
+    def keys(self):
+        return iter(self)
+    def values(self):
+        for k, v in zip(self._keys, self._values):
+            if k is not _FREE and k is not _DELETED:
+                yield v
+        if self._old is not None:
+            yield from self._old.values()
+    def items(self):
+        for k, v in zip(self._keys, self._values):
+            if k is not _FREE and k is not _DELETED:
+                yield (k, v)
+        if self._old is not None:
+            yield from self._old.items()
+    def clear(self):
+        self._alloc(8)
+        self.n = 0
+        self._old = None
+    def __repr__(self):
+        return "{" + ", ".join(f"{k}: {v!r}" for k, v in self.items()) + "}"
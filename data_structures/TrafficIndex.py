@@ -0,0 +1,108 @@
+from array import array
+import memory
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+CHUNK = 1440
+
+class TrafficIndex:
+    def __init__(self):
+        self.counts = {name: {} for name in RESOLUTIONS}
+        self.seconds = {name: {} for name in RESOLUTIONS}
+        self.first = None
+        self.last = None
+        self.calls = 0
+    def __len__(self):
+        return self.calls
+    def object_count(self):
+        return self.calls
+    def memory_usage(self):
+        return memory.heap(self.counts) + memory.heap(self.seconds), 0
+    def _add(self, name, bucket, count, seconds):
+        chunk, i = divmod(bucket, CHUNK)
+        counts = self.counts[name].get(chunk)
+        if counts is None:
+            counts = self.counts[name][chunk] = array('q', bytes(8 * CHUNK))
+            self.seconds[name][chunk] = array('q', bytes(8 * CHUNK))
+        counts[i] += count
+        self.seconds[name][chunk][i] += seconds
+    def add_many(self, starts, durations):
+        minutes = {}
+        for start, duration in zip(starts, durations):
+            m = start // 60
+            entry = minutes.get(m)
+            if entry is None:
+                minutes[m] = [1, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+        if not minutes:
+            return
+        hours = {}
+        add = self._add
+        for m, (count, seconds) in minutes.items():
+            add("minute", m, count, seconds)
+            entry = hours.get(m // 60)
+            if entry is None:
+                hours[m // 60] = [count, seconds]
+            else:
+                entry[0] += count
+                entry[1] += seconds
+        for h, (count, seconds) in hours.items():
+            add("hour", h, count, seconds)
+            add("day", h // 24, count, seconds)
+        lo = min(minutes) * 60
+        hi = max(minutes) * 60
+        self.first = lo if self.first is None else min(self.first, lo)
+        self.last = hi if self.last is None else max(self.last, hi)
+        self.calls += sum(entry[0] for entry in minutes.values())
+    def add(self, start, duration):
+        self.add_many((start,), (duration,))
+    def _range(self, width, start, end):
+        if start is None:
+            start = self.first if self.first is not None else 0
+        if end is None:
+            end = self.last + 1 if self.last is not None else start
+        return start // width, -(-end // width)
+    def series(self, resolution="hour", start=None, end=None):
+        width = RESOLUTIONS[resolution]
+        lo, hi = self._range(width, start, end)
+        counts = self.counts[resolution]
+        seconds = self.seconds[resolution]
+        out = []
+        for bucket in range(lo, hi):
+            chunk, i = divmod(bucket, CHUNK)
+            c = counts.get(chunk)
+            out.append((bucket * width, c[i], seconds[chunk][i]) if c is not None else (bucket * width, 0, 0))
+        return out
+    @staticmethod
+    def bucket_calls(calls, resolution="hour", start=None, end=None):
+        width = RESOLUTIONS[resolution]
+        buckets = {}
+        for call_start, duration in calls:
+            entry = buckets.get(call_start // width)
+            if entry is None:
+                buckets[call_start // width] = [1, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+        if not buckets:
+            return []
+        lo = min(buckets) if start is None else start // width
+        hi = max(buckets) + 1 if end is None else -(-end // width)
+        return [(b * width,) + tuple(buckets.get(b, (0, 0))) for b in range(lo, hi)]
+    @staticmethod
+    def busiest(series, window):
+        best = None
+        count = seconds = 0
+        for i, (bucket_start, c, s) in enumerate(series):
+            count += c
+            seconds += s
+            if i >= window:
+                count -= series[i - window][1]
+                seconds -= series[i - window][2]
+            if i >= window - 1 or i == len(series) - 1:
+                if best is None or count > best[1]:
+                    best = (series[max(0, i - window + 1)][0], count, seconds)
+        return best
+    def clear(self):
+        self.__init__()
@@ -1,28 +1,130 @@
+from bisect import bisect_right, insort
+import memory
+
+TOP_K = 32
+
 class TrieNode:
+    __slots__ = 'children', 'numbers', 'is_end', 'top'
     def __init__(self):
         self.children = {}
         self.numbers = set()
         self.is_end = False
+        self.top = []
 
 class Trie:
-    def __init__(self):
+    def __init__(self, score=None, top_k=TOP_K):
         self.root = TrieNode()
-    def insert(self,key,number):
+        self.score = score if score is not None else (lambda nid: 0)
+        self.top_k = top_k
+        self.paths = {}
+        self.generation = 0
+        self._ranked_cache = None
+        self._usage = None
+    def object_count(self):
+        return self._measure()[0]
+    def memory_usage(self):
+        return self._measure()[1], 0
+    def _measure(self):
+        if self._usage is None or self._usage[0] != len(self.paths):
+            nodes = 0
+            size = memory.heap(self.paths)
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                nodes += 1
+                size += memory.getsizeof(node) + memory.getsizeof(node.children) + memory.getsizeof(node.numbers) + memory.getsizeof(node.top)
+                stack.extend(node.children.values())
+            self._usage = (len(self.paths), nodes, size)
+        return self._usage[1:]
+    def insert(self,key,nid,score=None):
         key = key.lower()
+        self.paths[nid] = key
         node = self.root
         for child in key:
             if child not in node.children:
                 node.children[child] = TrieNode()
             node = node.children[child]
-            node.numbers.add(number)
+            node.numbers.add(nid)
         node.is_end = True
-        node.numbers.add(number)
-    def prefix_numbers(self,prefix,limit=200):
-        node = self.root 
-        for child in prefix.lower():
-            if child not in node.children:
-                return set()
+        self.generation += 1
+        if score is not None:
+            self.update(nid, score)
+    def _path(self, key):
+        node = self.root
+        for child in key:
             node = node.children[child]
+            yield node
+    def update(self, nid, score=None):
+        key = self.paths.get(nid)
+        if key is None:
+            return
+        entry = (-(self.score(nid) if score is None else score), nid)
+        self.generation += 1
+        k = self.top_k
+        for node in self._path(key):
+            top = node.top
+            for i, (_, other) in enumerate(top):
+                if other == nid:
+                    del top[i]
+                    break
+            else:
+                if len(top) >= k and entry >= top[-1]:
+                    continue
+            insort(top, entry)
+            if len(top) > k:
+                top.pop()
+    def update_many(self, ids):
+        score = self.score
+        for nid in ids:
+            if nid in self.paths:
+                self.update(nid, score(nid))
+    def rebuild(self):
+        self.generation += 1
+        k = self.top_k
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.top = []
+            stack.extend(node.children.values())
+        score = self.score
+        for entry in sorted((-score(nid), nid) for nid in self.paths):
+            for node in self._path(self.paths[entry[1]]):
+                if len(node.top) < k:
+                    node.top.append(entry)
+    def find(self, prefix):
+        node = self.root
+        for child in prefix.lower():
+            node = node.children.get(child)
+            if node is None:
+                return None
+        return node
+    def ranked(self, prefix, limit=TOP_K, cursor=None):
+        node = self.find(prefix)
+        if node is None or limit <= 0:
+            return [], None
+        top = node.top
+        complete = len(top) == len(node.numbers)
+        i = 0 if cursor is None else bisect_right(top, cursor)
+        if i + limit <= len(top) or complete:
+            page = top[i:i + limit]
+            more = i + limit < len(top) or not complete
+        else:
+            cache = self._ranked_cache
+            if cache is not None and cache[0] is node and cache[1] == self.generation:
+                ranked = cache[2]
+            else:
+                score = self.score
+                ranked = sorted((-score(nid), nid) for nid in node.numbers)
+                self._ranked_cache = (node, self.generation, ranked)
+            i = 0 if cursor is None else bisect_right(ranked, cursor)
+            page = ranked[i:i + limit]
+            more = i + limit < len(ranked)
+        next_cursor = page[-1] if page and more else None
+        return [nid for _, nid in page], next_cursor
+    def prefix_numbers(self,prefix,limit=200):
+        node = self.find(prefix)
+        if node is None:
+            return set()
         res = list(node.numbers)
         return set(res[:limit])
     def collect_all(self,node=None):
@@ -33,4 +135,4 @@ class Trie:
             res |= node.numbers
         for child in node.children.values():
             res |= self.collect_all(child)
-        return res
\ No newline at end of file
+        return res
@@ -1,58 +1,101 @@
+import argparse
+import math
 import random
 import time
+from datetime import datetime
+from itertools import accumulate
+from call_parser import format_call, to_epoch
+
 FILE_LENGTH = 1000000
-def str_time_prop(start, end, time_format, prop):
-    stime = time.mktime(time.strptime(start, time_format))
-    etime = time.mktime(time.strptime(end, time_format))
-    ptime = stime + prop * (etime - stime)
-    return time.strftime(time_format, time.localtime(ptime))
-def random_date(start, end, prop):
-    return str_time_prop(start, end, '%d.%m.%Y %H:%M:%S', prop)
-def random_duration(min, max):
-    duration = random.random()
-    minutes = random.randrange(0, 60)
-    seconds = random.randrange(0, 60)
-    hours = 0
-    if duration >= 0.9:
-        hours = random.randrange(min, max)
-    return "%02d:%02d:%02d" % (hours, minutes, seconds)
-def generate_calls():
-    with open("phones.txt") as input_file:
-        with open("calls.txt", "w") as output_file:
-            content = input_file.readlines()
-            for current_index in range(FILE_LENGTH):
-                date = random_date("01.01.2025 0:0:0",
-                                   "18.09.2025 23:59:59",
-                                   random.random())
-                duration = random_duration(0, 10)
-                while True:
-                    caller_index = random.randrange(0, len(content))
-                    callee_index = random.randrange(0, len(content))
-                    if caller_index != callee_index:
-                        break
-                caller_number = content[caller_index].replace("\n", "").split(",")[1]
-                callee_number = content[callee_index].replace("\n", "").split(",")[1]
-                data = [caller_number, callee_number, date, duration]
-                output_file.write(", ".join(data) + "\n")
-                print("%d/%d" % (current_index, FILE_LENGTH))
-
-def generate_blocks():
-    number_of_blocked = 100
-    choosen = set()
-    with open("phones.txt") as input_file:
-        with open("blocked.txt", "w") as output_file:
-            content = input_file.readlines()
-            while number_of_blocked > 0:
-                index = random.randint(0, len(content))
-                if index in choosen:
-                    continue
-                choosen.add(index)
-                number = content[index].split(",")[1]
-                output_file.write(number)
-                number_of_blocked -= 1
+CHUNK = 100000
+START_DATE = "01.01.2025"
+END_DATE = "18.09.2025"
+ZIPF = 1.1
+BLOCKED_FRACTION = 0.0015
+MEDIAN_DURATION = 90
+DURATION_SIGMA = 1.2
+MAX_DURATION = 10 * 3600
+HOUR_WEIGHTS = (2, 1, 1, 1, 1, 2, 4, 8, 12, 15, 16, 16, 14, 13, 14, 15, 16, 17, 16, 13, 10, 8, 6, 4)
+WEEKDAY_WEIGHTS = (10, 10, 10, 10, 11, 7, 6)
 
-if __name__ == '__main__':
-    generate_calls()
-    generate_blocks()
+def read_numbers(path):
+    with open(path, encoding="utf-8") as f:
+        next(f)
+        return [line.split(",")[1].strip() for line in f if "," in line]
+
+def zipf_weights(n, s):
+    return list(accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+
+def day_weights(start, end):
+    first = to_epoch(datetime.strptime(start, "%d.%m.%Y")) // 86400
+    last = to_epoch(datetime.strptime(end, "%d.%m.%Y")) // 86400
+    days = list(range(first, last + 1))
+    return [day * 86400 for day in days], list(accumulate(WEEKDAY_WEIGHTS[(day + 3) % 7] for day in days))
 
+def generate_calls(numbers, count=FILE_LENGTH, path="calls.txt", seed=None, zipf=ZIPF, start=START_DATE, end=END_DATE,
+                   median_duration=MEDIAN_DURATION, sigma=DURATION_SIGMA, chunk=CHUNK, quiet=False):
+    rng = random.Random(seed)
+    popular = numbers[:]
+    rng.shuffle(popular)
+    callee_weights = zipf_weights(len(popular), zipf) if zipf else None
+    day_starts, day_cum = day_weights(start, end)
+    hour_cum = list(accumulate(HOUR_WEIGHTS))
+    hour_starts = [h * 3600 for h in range(24)]
+    mu = math.log(median_duration)
+    choices = rng.choices
+    lognormal = rng.lognormvariate
+    rand = rng.random
+    started = time.perf_counter()
+    written = 0
+    with open(path, "w", encoding="utf-8") as out:
+        while written < count:
+            k = min(chunk, count - written)
+            callers = choices(numbers, k=k)
+            callees = choices(popular, cum_weights=callee_weights, k=k)
+            days = choices(day_starts, cum_weights=day_cum, k=k)
+            hours = choices(hour_starts, cum_weights=hour_cum, k=k)
+            lines = []
+            for caller_number, callee_number, day, hour in zip(callers, callees, days, hours):
+                while caller_number == callee_number:
+                    callee_number = choices(popular, cum_weights=callee_weights)[0]
+                duration = min(int(lognormal(mu, sigma)), MAX_DURATION)
+                lines.append(format_call((caller_number, callee_number, day + hour + int(rand() * 3600), duration)))
+            out.write("".join(lines))
+            written += k
+            if not quiet:
+                elapsed = time.perf_counter() - started
+                print(f"[i] {written:,}/{count:,} calls ({written / elapsed:,.0f} calls/s)")
+    return written
 
+def generate_blocks(numbers, fraction=BLOCKED_FRACTION, path="blocked.txt", seed=None):
+    rng = random.Random(seed)
+    chosen = rng.sample(numbers, max(1, round(len(numbers) * fraction)) if fraction else 0)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("".join(number + "\n" for number in chosen))
+    return len(chosen)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic call log and blocklist from the phonebook.")
+    parser.add_argument("-n", "--calls", type=int, default=FILE_LENGTH)
+    parser.add_argument("--phonebook", default="phones.txt")
+    parser.add_argument("--out", default="calls.txt")
+    parser.add_argument("--blocked-out", default="blocked.txt")
+    parser.add_argument("--blocked-fraction", type=float, default=BLOCKED_FRACTION, help="share of phonebook numbers to block")
+    parser.add_argument("--seed", type=int, help="same seed, same files")
+    parser.add_argument("--zipf", type=float, default=ZIPF, help="callee popularity exponent; 0 for uniform")
+    parser.add_argument("--start", default=START_DATE, help="first day (dd.mm.yyyy)")
+    parser.add_argument("--end", default=END_DATE, help="last day (dd.mm.yyyy)")
+    parser.add_argument("--median-duration", type=float, default=MEDIAN_DURATION, help="seconds; durations are log-normal")
+    parser.add_argument("--duration-sigma", type=float, default=DURATION_SIGMA)
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    parser.add_argument("--no-blocked", action="store_true", help="leave the blocklist untouched")
+    args = parser.parse_args()
+    numbers = read_numbers(args.phonebook)
+    generate_calls(numbers, args.calls, args.out, args.seed, args.zipf, args.start, args.end,
+                   args.median_duration, args.duration_sigma, args.chunk)
+    if not args.no_blocked:
+        blocked = generate_blocks(numbers, args.blocked_fraction, args.blocked_out, args.seed)
+        print(f"[i] Blocked {blocked} numbers in {args.blocked_out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import os
+import threading
+from call_parser import format_call
+
+JOURNAL_FILE = "calls.journal"
+GROUP_SIZE = 1024
+GROUP_MS = 50
+
+def repair_journal(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as file:
+        end = file.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(pos, 4096)
+            file.seek(pos - step)
+            chunk = file.read(step)
+            cut = chunk.rfind(b"\n")
+            if cut != -1:
+                pos = pos - step + cut + 1
+                break
+            pos -= step
+        if pos != end:
+            file.truncate(pos)
+            print(f"[!] Journal {path}: dropped {end - pos} bytes of a torn record.")
+        return pos
+
+class CallJournal:
+    def __init__(self, path=JOURNAL_FILE, group_size=GROUP_SIZE, group_ms=GROUP_MS, fsync=False):
+        self.path = path
+        self.group_size = max(1, group_size)
+        self.group_ms = group_ms
+        self.fsync = fsync
+        repair_journal(path)
+        self.file = open(path, "ab")
+        self.offset = self.file.tell()
+        self.buffer = []
+        self.pending = 0
+        self.records = 0
+        self.commits = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        if group_ms:
+            self._flusher = threading.Thread(target=self._run, daemon=True)
+            self._flusher.start()
+    def append(self, calls):
+        data = "".join(map(format_call, calls))
+        with self.lock:
+            self.buffer.append(data)
+            self.pending += len(calls)
+            if self.pending >= self.group_size:
+                self._commit()
+    def _commit(self):
+        if not self.buffer:
+            return
+        data = "".join(self.buffer).encode("utf-8")
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.offset += len(data)
+        self.records += self.pending
+        self.commits += 1
+        self.buffer = []
+        self.pending = 0
+    def flush(self):
+        with self.lock:
+            self._commit()
+            return self.offset
+    def _run(self):
+        interval = self.group_ms / 1000
+        while not self._stop.wait(interval):
+            if self.pending:
+                self.flush()
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self.lock:
+            self._commit()
+            self.file.close()
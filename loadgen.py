@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from data_structures.LatencyHistogram import LatencyHistogram
+from server import HOST, PORT
+
+MIX = (("search", 4), ("autocomplete", 3), ("history", 2), ("top", 1), ("call", 1))
+
+def make_request(rng, numbers, prefixes):
+    op = rng.choices([op for op, _ in MIX], weights=[w for _, w in MIX])[0]
+    if op == "search":
+        return {"op": "search", "kind": rng.choice(("first", "last", "phone")), "prefix": rng.choice(prefixes), "limit": 20}
+    if op == "autocomplete":
+        return {"op": "autocomplete", "kind": "first", "prefix": rng.choice(prefixes), "limit": 10}
+    if op == "history":
+        return {"op": "history", "number": rng.choice(numbers), "limit": 20}
+    if op == "top":
+        return {"op": "top", "n": 10}
+    return {"op": "call_start", "caller": rng.choice(numbers), "callee": rng.choice(numbers)}
+
+async def client(host, port, numbers, prefixes, deadline, depth, seed, stats):
+    rng = random.Random(seed)
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        await session(reader, writer, rng, numbers, prefixes, deadline, depth, stats)
+    except ConnectionError:
+        stats["refused"] += 1
+
+async def session(reader, writer, rng, numbers, prefixes, deadline, depth, stats):
+    sent = {}
+    next_id = 0
+    async def send(req):
+        nonlocal next_id
+        next_id += 1
+        req["id"] = next_id
+        sent[next_id] = (time.perf_counter_ns(), req["op"])
+        writer.write((json.dumps(req) + "\n").encode("utf-8"))
+    for _ in range(depth):
+        await send(make_request(rng, numbers, prefixes))
+    await writer.drain()
+    while sent:
+        line = await reader.readline()
+        if not line:
+            break
+        resp = json.loads(line)
+        if resp["id"] is None:
+            stats["refused"] += 1
+            break
+        started, op = sent.pop(resp["id"])
+        stats["latency"].record(time.perf_counter_ns() - started)
+        stats["ok" if resp["ok"] else "errors"] += 1
+        if resp["ok"] and op == "call_start":
+            await send({"op": "call_end", "call_id": resp["result"]["call_id"]})
+        elif time.perf_counter() < deadline:
+            await send(make_request(rng, numbers, prefixes))
+        await writer.drain()
+    writer.close()
+
+async def run(host, port, connections, depth, seconds, seed):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "top", "n": 200}\n')
+    await writer.drain()
+    numbers = [number for number, _ in json.loads(await reader.readline())["result"]]
+    writer.close()
+    if not numbers:
+        raise SystemExit("[!] Server has no calls to sample numbers from.")
+    prefixes = sorted({n[:k] for n in numbers for k in (1, 2, 3)} | {"a", "b", "m", "s", "jo", "ma"})
+    stats = {"ok": 0, "errors": 0, "refused": 0, "latency": LatencyHistogram()}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(client(host, port, numbers, prefixes, deadline, depth, seed + i, stats) for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    latency = stats["latency"]
+    total = stats["ok"] + stats["errors"]
+    print(f"[i] {total} requests in {elapsed:.2f}s over {connections} connections (depth {depth}): {total / elapsed:,.0f} req/s, {stats['errors']} errors, {stats['refused']} connections refused")
+    print("[i] Latency (ms): " + "  ".join(f"p{p}={latency.percentile(p) / 1e6:.2f}" for p in (50, 95, 99)) + f"  max={latency.max / 1e6:.2f}")
+    return total / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the switchboard server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.connections, args.depth, args.seconds, args.seed))
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
-from central import Central
+from datetime import datetime
+from central import Central, STAGES
+from call_parser import to_epoch
 
 def menu():
     print("-"*30)
@@ -18,15 +20,87 @@ def menu():
     print("13. PAUSE STRESS TEST")
     print("14. RESUME STRESS TEST")
     print("15. STOP STRESS TEST")
+    print("16. TRAFFIC ANALYTICS")
+    print("17. EXPORT STRESS TEST DATA (CSV)")
+    print("18. MEMORY REPORT")
+    print("19. PROFILING")
+    print("20. CHECKPOINT (INCREMENTAL SAVE)")
     print("X. EXIT APPLICATION")
     print("-"*30)
 
+def print_search_pages(c, kind, query, page_size=20):
+    cursor = None
+    i = 0
+    while True:
+        result, cursor = c.search_page(kind, query, limit=page_size, cursor=cursor)
+        for num in result:
+            i += 1
+            print(f"{i}) {c.nice_entry(num)}  [score={c.score(num):.1f}]")
+        if cursor is None:
+            input("Press ENTER to return to menu...")
+            return
+        if input("Press ENTER for more results or q to return to menu... ").strip().lower() == "q":
+            return
+
+def read_date(prompt):
+    while True:
+        text = input(prompt).strip()
+        if not text:
+            return None
+        try:
+            return to_epoch(datetime.strptime(text, "%d.%m.%Y"))
+        except ValueError:
+            print("[!] Use the format dd.mm.yyyy")
+
+def print_history_pages(show, *numbers):
+    start = read_date("From date (dd.mm.yyyy, ENTER = beginning): ")
+    end = read_date("To date (dd.mm.yyyy, ENTER = latest): ")
+    if end is not None:
+        end += 86400
+    cursor = show(*numbers, start=start, end=end)
+    while cursor is not None:
+        if input("Press ENTER for more calls or q to return to menu... ").strip().lower() == "q":
+            return
+        cursor = show(*numbers, start=start, end=end, cursor=cursor)
+
+def profiling_menu(c):
+    p = c.profiler
+    print(f"Profiling is {'on' if p.enabled else 'off'}.")
+    print("1. TURN ON" if not p.enabled else "1. TURN OFF")
+    print("2. SHOW OPERATION STATS")
+    print("3. CAPTURE CPROFILE OF NEXT N OPERATIONS")
+    print("4. RESET STATS")
+    choice = input("Choice: ").strip()
+    if choice == "1":
+        if p.enabled:
+            p.disable()
+        else:
+            p.enable()
+        print(f"[i] Profiling turned {'on' if p.enabled else 'off'}.")
+    elif choice == "2":
+        p.report()
+        input("Press ENTER to return to menu...")
+    elif choice == "3":
+        n = input("Operations to capture (ENTER = 100): ").strip()
+        path = input("Output file (ENTER = central.prof): ").strip() or "central.prof"
+        p.capture(int(n) if n else 100, path)
+        print(f"[i] Capturing the next operations into {path}; inspect with: python -m pstats {path}")
+    elif choice == "4":
+        p.reset()
+        print("[i] Profiling stats cleared.")
+    else:
+        print("Unknown option!")
+
+def print_loading(c):
+    loading = [f"{STAGES[name]} {done:.0%}" for name, done in c.status().items() if done < 1]
+    if loading:
+        print("[i] Still loading in the background: " + ", ".join(loading))
+
 def main():
     c = Central()
-    c.load_phonebook()
-    c.load_calls(limit=50000)
-    c.load_blocked()
+    c.startup(background=True)
     while True:
+        print_loading(c)
         menu()
         option = input("Choose an option: ").strip()
         if option == "1":
@@ -59,7 +133,7 @@ def main():
                 sug = c.suggest_similar_numbers(number)
                 if sug:
                     print("Did you mean:", ", ".join(sug))
-            c.show_history_1(number)
+            print_history_pages(c.show_history_1, number)
         elif option == "4":
             while True:
                 number1 = input("Enter first number: ").strip()
@@ -77,31 +151,17 @@ def main():
                 sug = c.suggest_similar_numbers(number2)
                 if sug:
                     print("Did you mean:", ", ".join(sug))
-            c.show_history_2(number1,number2)
+            print_history_pages(c.show_history_2, number1, number2)
         elif option == "5":
             print("Choose search filter: ")
             print("1. FIRST NAME")
             print("2. LAST NAME")
             print("3. PHONE NUMBER")
             search_filter = input("Choice: ").strip()
-            if search_filter == "1":
-                name = input("Search.... : ").strip()
-                result = c.search_by_first(name,limit=1000)
-                for i,num in enumerate(result,start=1):
-                    print(f"{i}) {c.nice_entry(num)}  [score={c.popularity_graph.get_score(num):.1f}]")
-                input("Press ENTER to return to menu...")
-            if search_filter == "2":
-                forname = input("Search.... : ").strip()
-                result = c.search_by_last(forname,limit=1000)
-                for i,num in enumerate(result,start=1):
-                    print(f"{i}) {c.nice_entry(num)}  [score={c.popularity_graph.get_score(num):.1f}]")
-                input("Press ENTER to return to menu...")
-            if search_filter == "3":
-                number = input("Search.... : ").strip()
-                result = c.search_by_phone(number,limit=1000)
-                for i,num in enumerate(result,start=1):
-                    print(f"{i}) {c.nice_entry(num)}  [score={c.popularity_graph.get_score(num):.1f}]")
-                input("Press ENTER to return to menu...")
+            kinds = {"1": "first", "2": "last", "3": "phone"}
+            if search_filter in kinds:
+                query = input("Search.... : ").strip()
+                print_search_pages(c, kinds[search_filter], query)
             else:
                 print("Unknown option!")
         elif option=="6":
@@ -111,10 +171,15 @@ def main():
                 print("Suggestions:", c.suggest_similar_numbers(number))
             elif filter=="2":
                 name = input("Enter first/last name: ").strip()
-                print("Suggestions:", c.suggest_similar_names(name))
+                sug = c.suggest_similar_names(name)
+                if not sug:
+                    print("[!] No similar names found.")
+                for nid in sug:
+                    print(c.nice_entry(c.numbers[nid]))
             else:
                 print("Unknown option!")
         elif option == "x":
+            c.close_journal()
             print("Thank you for using the application!")
             break
         elif option=="7":
@@ -128,7 +193,7 @@ def main():
                 kind_b = "phone"
             comps = c.autocomplete(pref, kind=kind_b)
             for comp in comps:
-                print(c.nice_entry(comp), f"[score={c.popularity_graph.get_score(comp):.1f}]")
+                print(c.nice_entry(comp), f"[score={c.score(comp):.1f}]")
             input("Press ENTER to return to menu...")
         elif option=="8":
             c.save_state()
@@ -136,16 +201,27 @@ def main():
             c.load_state()
         elif option=="10":
             n = eval(input("Enter how many top numbers to show: ").strip())
-            for i,(num,score) in enumerate(c.popularity_graph.top_n(n), start=1):
+            for i,(num,score) in enumerate(c.top_n(n), start=1):
                 print(f"{i}) {c.nice_entry(num)} score={score:.1f}")
+            number = input("Rank of number (ENTER to skip): ").strip()
+            if number:
+                rank = c.rank(number)
+                if rank is None:
+                    print("[!] Number has no calls yet.")
+                else:
+                    print(f"{c.nice_entry(number)} is ranked #{rank} with score={c.score(number):.1f}")
         elif option=="11":
             c.print_pop_graph(limit=100)
         elif option=="12":
             sec = input("Duration (seconds): ").strip()
             calls = input("Number of calls: ").strip()
+            workers = input("Workers (ENTER = 4): ").strip()
+            rate = input("Target rate in calls/s (ENTER = calls/duration, 0 = unlimited): ").strip()
             sec = int(sec) if sec else 60
             calls = int(calls) if calls else 1000
-            c.start_stress_test(duration_seconds=sec, target_calls=calls)
+            workers = int(workers) if workers else 4
+            rate = float(rate) if rate else None
+            c.start_stress_test(duration_seconds=sec, target_calls=calls, workers=workers, rate=rate)
         elif option=="13":
             c.pause_stress_test()
         elif option=="14":
@@ -153,6 +229,32 @@ def main():
         elif option=="15":
             c.stop_stress_test()
             c.stress_report()
+        elif option=="16":
+            resolution = input("Resolution (minute/hour/day): ").strip() or "hour"
+            if resolution not in ("minute", "hour", "day"):
+                print("Unknown option!")
+                continue
+            number = input("Number (ENTER = all calls): ").strip() or None
+            start = read_date("From date (dd.mm.yyyy, ENTER = last 7 days): ")
+            end = read_date("To date (dd.mm.yyyy, ENTER = latest): ")
+            if end is not None:
+                end += 86400
+            if start is None:
+                last = c.last_call_time()
+                start = (end if end is not None else (last or 0) + 86400) - 7 * 86400
+                start -= start % 86400
+            c.show_traffic(resolution, start, end, number)
+            input("Press ENTER to return to menu...")
+        elif option=="17":
+            prefix = input("File prefix (ENTER = stress): ").strip() or "stress"
+            c.export_stress_csv(prefix)
+        elif option=="18":
+            c.show_memory_report()
+            input("Press ENTER to return to menu...")
+        elif option=="19":
+            profiling_menu(c)
+        elif option=="20":
+            c.checkpoint()
         else:
             print("Unknown option!")
         
@@ -0,0 +1,49 @@
+import os
+import sys
+from array import array
+from itertools import islice
+
+SAMPLE = 256
+getsizeof = sys.getsizeof
+
+def sampled(items, size_of, n=None, k=SAMPLE):
+    if n is None:
+        n = len(items)
+    if not n:
+        return 0
+    if isinstance(items, (list, tuple, array)) and n > k:
+        step = n / k
+        picked = [items[int(i * step)] for i in range(k)]
+    else:
+        picked = list(islice(items, k))
+    if not picked:
+        return 0
+    return int(sum(size_of(item) for item in picked) * n / len(picked))
+
+def heap(obj):
+    if isinstance(obj, (int, memoryview)):
+        return 0
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return getsizeof(obj) + sampled(obj, heap)
+    if isinstance(obj, dict):
+        return getsizeof(obj) + sampled(obj.items(), lambda kv: heap(kv[0]) + heap(kv[1]), len(obj))
+    return getsizeof(obj)
+
+def mapped(*objs):
+    return sum(obj.nbytes for obj in objs if isinstance(obj, memoryview))
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), False
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0, False
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (rss if sys.platform == "darwin" else rss * 1024), True
+
+def mb(n):
+    return n / (1 << 20)
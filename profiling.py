@@ -0,0 +1,152 @@
+import cProfile
+import threading
+from functools import wraps
+from time import perf_counter
+
+OPERATIONS = ("load_phonebook", "load_calls", "load_blocked", "load_state", "save_state", "recover_journal",
+              "ingest_calls", "add_contact", "search_by_first", "search_by_last", "search_by_phone", "search_page",
+              "autocomplete", "suggest_similar_numbers", "suggest_similar_names", "history", "pair_history",
+              "show_history_1", "show_history_2", "top_n", "rank", "traffic_series", "memory_report")
+GRAPH_OPERATIONS = ("record_call",)
+RESIZE = "hashmap.resize"
+
+class OpStats:
+    __slots__ = "count", "total", "max"
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+class Profiler:
+    def __init__(self, central):
+        self.central = central
+        self.enabled = False
+        self.ops = {}
+        self.lock = threading.Lock()
+        self._wrapped = []
+        self._local = threading.local()
+        self._capture = None
+        self._capture_left = 0
+        self._capture_path = None
+        self._capture_lock = threading.Lock()
+        self._maps = []
+    def _stats(self, name):
+        op = self.ops.get(name)
+        if op is None:
+            with self.lock:
+                op = self.ops.setdefault(name, OpStats())
+        return op
+    def _wrap(self, owner, name, label):
+        fn = getattr(owner, name)
+        op = self._stats(label)
+        local = self._local
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            profile = self._capture if not depth and self._capture is not None else None
+            if profile is not None and not self._capture_lock.acquire(blocking=False):
+                profile = None
+            start = perf_counter()
+            try:
+                if profile is None:
+                    return fn(*args, **kwargs)
+                profile.enable()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+            finally:
+                elapsed = perf_counter() - start
+                local.depth = depth
+                op.add(elapsed)
+                if profile is not None:
+                    self._captured(profile)
+        setattr(owner, name, timed)
+        self._wrapped.append((owner, name))
+    def _on_resize(self, seconds):
+        if self.enabled:
+            self._stats(RESIZE).add(seconds)
+    def _hook_maps(self):
+        c = self.central
+        for m in (c.calls.by_pair, c.phonebook):
+            if not any(m is hooked for hooked, _, _ in self._maps):
+                self._hook(m)
+    def _hook(self, m):
+        previous = m.pause_hook
+        def hook(seconds):
+            self._on_resize(seconds)
+            if previous is not None:
+                previous(seconds)
+        m.pause_hook = hook
+        self._maps.append((m, hook, previous))
+    def enable(self):
+        if self.enabled:
+            return
+        c = self.central
+        for name in OPERATIONS:
+            self._wrap(c, name, name)
+        for name in GRAPH_OPERATIONS:
+            self._wrap(c.popularity_graph, name, "graph." + name)
+        timed_load = c.load_state
+        def load_state(*args, **kwargs):
+            try:
+                return timed_load(*args, **kwargs)
+            finally:
+                self._hook_maps()
+        c.load_state = load_state
+        self._hook_maps()
+        self.enabled = True
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, name in self._wrapped:
+            owner.__dict__.pop(name, None)
+        self._wrapped = []
+        for m, hook, previous in self._maps:
+            if m.pause_hook is hook:
+                m.pause_hook = previous
+        self._maps = []
+        self.cancel_capture()
+    def reset(self):
+        with self.lock:
+            for op in self.ops.values():
+                op.__init__()
+    def stats(self):
+        with self.lock:
+            items = list(self.ops.items())
+        return sorted(((name, op.count, op.total, op.max, op.total / op.count) for name, op in items if op.count),
+                      key=lambda row: row[2], reverse=True)
+    def capture(self, n, path):
+        self.enable()
+        self._capture_path = path
+        self._capture_left = max(1, n)
+        self._capture = cProfile.Profile()
+    def cancel_capture(self):
+        self._capture = None
+        self._capture_left = 0
+    def _captured(self, profile):
+        try:
+            self._capture_left -= 1
+            if self._capture_left > 0 or self._capture is not profile:
+                return
+            self._capture = None
+            profile.dump_stats(self._capture_path)
+            print(f"\n[i] cProfile of the last operations written to {self._capture_path}")
+        finally:
+            self._capture_lock.release()
+    def report(self):
+        rows = self.stats()
+        if not rows:
+            print("[!] No operations recorded yet." if self.enabled else "[!] Profiling is off.")
+            return rows
+        print(f"{'operation':<26}{'count':>10}{'total s':>10}{'mean ms':>10}{'max ms':>10}")
+        for name, count, total, worst, mean in rows:
+            print(f"{name:<26}{count:>10,}{total:>10.3f}{mean * 1e3:>10.3f}{worst * 1e3:>10.3f}")
+        return rows
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+
+class RWLock:
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+        self._waiting_readers = 0
+        self._admitted = 0
+        self._releases = 0
+        self._tickets = 0
+        self._serving = 0
+        self._local = threading.local()
+    def acquire_read(self):
+        local = self._local
+        if getattr(local, "reads", 0):
+            local.reads += 1
+            return
+        if self._writer == threading.get_ident():
+            local.reads = 1
+            local.counted = False
+            return
+        with self._cond:
+            turn = self._releases
+            if self._writer is not None or self._waiting_writers:
+                self._waiting_readers += 1
+                while self._writer is not None or (self._waiting_writers and self._releases == turn):
+                    self._cond.wait()
+                self._waiting_readers -= 1
+                if self._releases != turn and self._admitted:
+                    self._admitted -= 1
+            self._readers += 1
+        local.reads = 1
+        local.counted = True
+    def release_read(self):
+        local = self._local
+        local.reads -= 1
+        if local.reads or not local.counted:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._depth += 1
+            return
+        if getattr(self._local, "reads", 0):
+            raise RuntimeError("cannot upgrade a read lock to a write lock")
+        with self._cond:
+            self._waiting_writers += 1
+            ticket = self._tickets
+            self._tickets += 1
+            while self._writer is not None or self._readers or self._admitted or ticket != self._serving:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._depth = 1
+    def release_write(self):
+        self._depth -= 1
+        if self._depth:
+            return
+        with self._cond:
+            self._writer = None
+            self._serving += 1
+            self._releases += 1
+            self._admitted = self._waiting_readers
+            self._cond.notify_all()
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
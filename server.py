@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import json
+import signal
+from central import Central, SERIAL_FILE, HISTORY_PAGE
+from call_parser import format_start, format_duration, to_epoch
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_CONNECTIONS = 256
+MAX_IN_FLIGHT = 8
+MAX_LINE = 1 << 16
+
+class SwitchboardServer:
+    def __init__(self, central, host=HOST, port=PORT, max_connections=MAX_CONNECTIONS, max_in_flight=MAX_IN_FLIGHT):
+        self.central = central
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+        self.ops = {
+            "ping": self.op_ping,
+            "call_start": self.op_call_start,
+            "call_end": self.op_call_end,
+            "history": self.op_history,
+            "pair_history": self.op_pair_history,
+            "search": self.op_search,
+            "autocomplete": self.op_autocomplete,
+            "top": self.op_top,
+            "score": self.op_score,
+            "add_contact": self.op_add_contact,
+        }
+    def _rows(self, rows, cursor):
+        calls = self.central.calls
+        out = []
+        for row in rows:
+            caller_number, callee_number, start, duration = calls.row(row)
+            out.append([caller_number, callee_number, format_start(start), format_duration(duration)])
+        return {"rows": out, "cursor": list(cursor) if cursor is not None else None}
+    def op_ping(self, req):
+        return "pong"
+    def op_call_start(self, req):
+        return {"call_id": self.central.begin_call(req["caller"], req["callee"])}
+    def op_call_end(self, req):
+        caller_number, callee_number, start, dur = self.central.end_call(int(req["call_id"]))
+        return {"caller": caller_number, "callee": callee_number,
+                "start": format_start(to_epoch(start)), "duration": format_duration(int(dur.total_seconds()))}
+    def op_history(self, req):
+        rows, cursor = self.central.history(req["number"], req.get("start"), req.get("end"),
+                                            int(req.get("limit", HISTORY_PAGE)), req.get("cursor"))
+        return self._rows(rows, cursor)
+    def op_pair_history(self, req):
+        rows, cursor = self.central.pair_history(req["number1"], req["number2"], req.get("start"), req.get("end"),
+                                                 int(req.get("limit", HISTORY_PAGE)), req.get("cursor"))
+        return self._rows(rows, cursor)
+    def op_search(self, req):
+        cursor = req.get("cursor")
+        numbers, cursor = self.central.search_page(req.get("kind", "first"), req.get("prefix", ""),
+                                                   int(req.get("limit", 20)), tuple(cursor) if cursor else None)
+        return {"numbers": numbers, "cursor": list(cursor) if cursor is not None else None}
+    def op_autocomplete(self, req):
+        return self.central.autocomplete(req.get("prefix", ""), kind=req.get("kind", "first"), limit=int(req.get("limit", 20)))
+    def op_top(self, req):
+        return self.central.top_n(int(req.get("n", 10)))
+    def op_score(self, req):
+        return {"score": self.central.score(req["number"]), "rank": self.central.rank(req["number"])}
+    def op_add_contact(self, req):
+        self.central.add_contact(req.get("first_name", ""), req.get("last_name", ""), req["number"])
+        return {"number": req["number"]}
+    def handle(self, line):
+        req_id = None
+        try:
+            req = json.loads(line)
+            req_id = req.get("id")
+            op = self.ops.get(req.get("op"))
+            if op is None:
+                raise ValueError(f"unknown op {req.get('op')!r}")
+            resp = {"id": req_id, "ok": True, "result": op(req)}
+        except Exception as e:
+            resp = {"id": req_id, "ok": False, "error": str(e) or type(e).__name__}
+        return (json.dumps(resp) + "\n").encode("utf-8")
+    async def _serve_client(self, reader, writer):
+        if self.connections >= self.max_connections:
+            writer.write(b'{"id": null, "ok": false, "error": "server busy"}\n')
+            await writer.drain()
+            writer.close()
+            return
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        async def respond(line):
+            try:
+                data = await loop.run_in_executor(None, self.handle, line)
+                async with write_lock:
+                    writer.write(data)
+                    await writer.drain()
+            except (ConnectionError, RuntimeError):
+                pass
+            finally:
+                in_flight.release()
+        try:
+            while True:
+                await in_flight.acquire()
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b'{"id": null, "ok": false, "error": "request too long"}\n')
+                    in_flight.release()
+                    break
+                if not line:
+                    in_flight.release()
+                    break
+                if not line.strip():
+                    in_flight.release()
+                    continue
+                self.requests += 1
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve_client, self.host, self.port, limit=MAX_LINE)
+        return self.server
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"[i] Switchboard listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the switchboard as a JSON-lines TCP server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--state", default=SERIAL_FILE)
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    args = parser.parse_args()
+    c = Central()
+    c.startup(args.state)
+    server = SwitchboardServer(c, args.host, args.port, args.max_connections, args.max_in_flight)
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        c.close_journal()
+        print("[i] Server stopped.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import sys
+import threading
+import zlib
+from journal import JOURNAL_FILE
+from central import Central, PHONEBOOK_FILE, CALLS_FILE, BLOCKED_FILE, SERIAL_FILE, HISTORY_PAGE
+
+SHARDS = os.cpu_count() or 1
+
+def shard_of(number, count):
+    return zlib.crc32(number.encode("utf-8")) % count
+
+def shard_path(path, index):
+    return f"{path}.shard{index}"
+
+class Shard:
+    def __init__(self, index, count, journal_path=None):
+        self.index = index
+        self.count = count
+        self.central = Central()
+        self._owned = {}
+        self.central.journal_path = shard_path(journal_path or JOURNAL_FILE, index)
+        if journal_path is not None:
+            self.central.open_journal(self.central.journal_path)
+    def owns(self, number):
+        owned = self._owned.get(number)
+        if owned is None:
+            owned = self._owned[number] = shard_of(number, self.count) == self.index
+        return owned
+    def owns_call(self, call):
+        return self.owns(call[0]) or self.owns(call[1])
+    def load_phonebook(self, path):
+        self.central.load_phonebook(path, keep=self.owns)
+        return len(self.central.phonebook)
+    def load_blocked(self, path):
+        self.central.load_blocked(path)
+    def blocked(self):
+        return self.central.blocked
+    def load_calls(self, path, limit):
+        self.central.load_calls(path, limit, keep=self.owns_call)
+        return len(self.central.calls)
+    def ingest(self, batch):
+        return self.central.ingest_calls(batch, check_blocked=False)[0]
+    def _records(self, page):
+        rows, cursor = page
+        row = self.central.calls.row
+        return [row(r) for r in rows], cursor
+    def history(self, number, start, end, limit, cursor):
+        return self._records(self.central.history(number, start, end, limit, cursor))
+    def pair_history(self, number1, number2, start, end, limit, cursor):
+        return self._records(self.central.pair_history(number1, number2, start, end, limit, cursor))
+    def search(self, kind, prefix, limit):
+        score = self.central.score
+        return [(score(number), number) for number in self.central.search_page(kind, prefix, limit)[0]]
+    def top(self, n):
+        m = n
+        while True:
+            top = self.central.top_n(m)
+            owned = [(number, score) for number, score in top if self.owns(number)]
+            if len(owned) >= n or len(top) < m:
+                return owned[:n]
+            m *= 4
+    def score(self, number):
+        return self.central.score(number)
+    def save_state(self, path):
+        self.central.save_state(shard_path(path, self.index))
+    def checkpoint(self, path):
+        self.central.checkpoint(shard_path(path, self.index))
+    def load_state(self, path):
+        self.central.load_state(shard_path(path, self.index))
+        return len(self.central.calls)
+    def stats(self):
+        return {"contacts": len(self.central.phonebook), "calls": len(self.central.calls)}
+    def close(self):
+        self.central.close_journal()
+
+def serve_shard(index, count, conn, journal_path, quiet):
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+    shard = Shard(index, count, journal_path)
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            op, args = request
+            try:
+                conn.send((True, getattr(shard, op)(*args)))
+            except Exception as e:
+                conn.send((False, e))
+    finally:
+        shard.close()
+        conn.close()
+
+class ShardedCentral:
+    def __init__(self, shards=SHARDS, journal_path=None, quiet=True):
+        self.count = shards
+        self.blocked = set()
+        self._owner = {}
+        self.lock = threading.Lock()
+        context = multiprocessing.get_context("spawn")
+        self.conns = []
+        self.procs = []
+        for i in range(shards):
+            conn, child = context.Pipe()
+            proc = context.Process(target=serve_shard, args=(i, shards, child, journal_path, quiet), name=f"shard-{i}", daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(conn)
+            self.procs.append(proc)
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    def shard_for(self, number):
+        owner = self._owner.get(number)
+        if owner is None:
+            owner = self._owner[number] = shard_of(number, self.count)
+        return owner
+    def _send(self, requests):
+        with self.lock:
+            for i, op, args in requests:
+                self.conns[i].send((op, args))
+            replies = [self.conns[i].recv() for i, _, _ in requests]
+        results = []
+        for ok, value in replies:
+            if not ok:
+                raise value
+            results.append(value)
+        return results
+    def _all(self, op, *args):
+        return self._send([(i, op, args) for i in range(self.count)])
+    def _one(self, number, op, *args):
+        return self._send([(self.shard_for(number), op, args)])[0]
+    def close(self):
+        with self.lock:
+            for conn in self.conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for proc in self.procs:
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+            for conn in self.conns:
+                conn.close()
+            self.conns = []
+            self.procs = []
+    def load_phonebook(self, path=PHONEBOOK_FILE):
+        contacts = sum(self._all("load_phonebook", path))
+        print(f"[i] Loaded {contacts} contacts into {self.count} shards")
+        return contacts
+    def load_blocked(self, path=BLOCKED_FILE):
+        with open(path, encoding='utf-8') as file:
+            self.blocked.update(line.strip() for line in file if line.strip())
+        self._all("load_blocked", path)
+    def load_calls(self, path=CALLS_FILE, limit=None):
+        stored = self._all("load_calls", path, limit)
+        print(f"[i] Loaded calls into {self.count} shards: {', '.join(map(str, stored))} rows stored")
+        return stored
+    def ingest_calls(self, batch, check_blocked=True):
+        blocked = 0
+        if check_blocked and self.blocked:
+            accepted = [call for call in batch if call[0] not in self.blocked and call[1] not in self.blocked]
+            blocked = len(batch) - len(accepted)
+            batch = accepted
+        parts = [[] for _ in range(self.count)]
+        shard_for = self.shard_for
+        for call in batch:
+            a = shard_for(call[0])
+            b = shard_for(call[1])
+            parts[a].append(call)
+            if b != a:
+                parts[b].append(call)
+        self._send([(i, "ingest", (part,)) for i, part in enumerate(parts) if part])
+        return len(batch), blocked
+    def history(self, number, start=None, end=None, limit=HISTORY_PAGE, cursor=None):
+        return self._one(number, "history", number, start, end, limit, cursor)
+    def pair_history(self, number1, number2, start=None, end=None, limit=HISTORY_PAGE, cursor=None):
+        return self._one(number1, "pair_history", number1, number2, start, end, limit, cursor)
+    def search_page(self, kind, prefix, limit=20):
+        found = [hit for hits in self._all("search", kind, prefix, limit) for hit in hits]
+        found.sort(key=lambda hit: (-hit[0], hit[1]))
+        return [number for _, number in found[:limit]]
+    def search_by_first(self, q, limit=50):
+        return self.search_page("first", q, limit)
+    def search_by_last(self, q, limit=200):
+        return self.search_page("last", q, limit)
+    def search_by_phone(self, pref, limit=200):
+        return self.search_page("phone", pref, limit)
+    def autocomplete(self, prefix, kind="first", limit=20):
+        return self.search_page(kind, prefix, limit)
+    def top_n(self, n=10):
+        top = [entry for entries in self._all("top", n) for entry in entries]
+        top.sort(key=lambda entry: (-entry[1], entry[0]))
+        return top[:n]
+    def score(self, number):
+        return self._one(number, "score", number)
+    def save_state(self, path=SERIAL_FILE):
+        self._all("save_state", path)
+        print(f"[i] Saved {self.count} shard snapshots to {shard_path(path, '*')}")
+    def checkpoint(self, path=SERIAL_FILE):
+        self._all("checkpoint", path)
+    def load_state(self, path=SERIAL_FILE):
+        stored = self._all("load_state", path)
+        self.blocked = set(self._send([(0, "blocked", ())])[0])
+        print(f"[i] Loaded {self.count} shard snapshots: {', '.join(map(str, stored))} rows stored")
+    def stats(self):
+        return self._all("stats")
@@ -0,0 +1,99 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b"TCSNAP\x00\x01"
+VERSION = 2
+HEADER = struct.Struct("<8sII")
+NAME_SIZE = 24
+ENTRY = struct.Struct(f"<{NAME_SIZE}s2sxxxxxxQQ")
+ALIGN = 8
+
+def pack_strings(values):
+    offsets = array('q', [0])
+    parts = []
+    total = 0
+    for value in values:
+        data = value.encode("utf-8")
+        parts.append(data)
+        total += len(data)
+        offsets.append(total)
+    return offsets, b"".join(parts)
+
+def unpack_strings(offsets, blob):
+    blob = bytes(blob)
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+def delta_path(path, sequence):
+    return f"{path}.delta{sequence}"
+
+def delta_paths(path):
+    folder, name = os.path.split(path)
+    prefix = name + ".delta"
+    found = [(int(f[len(prefix):]), f) for f in os.listdir(folder or ".") if f.startswith(prefix) and f[len(prefix):].isdigit()]
+    return [os.path.join(folder, f) for _, f in sorted(found)]
+
+class SnapshotWriter:
+    def __init__(self):
+        self.sections = []
+        self.meta = {}
+    def add(self, name, data, typecode=None):
+        if not 0 < len(name) <= NAME_SIZE or not name.isascii():
+            raise ValueError(f"Snapshot section name {name!r} must be 1-{NAME_SIZE} ASCII characters")
+        if typecode is None:
+            typecode = data.typecode if isinstance(data, array) else data.format if isinstance(data, memoryview) else "B"
+        self.sections.append((name, typecode, data))
+    def add_strings(self, name, values):
+        offsets, blob = pack_strings(values)
+        self.add(name + ".offsets", offsets)
+        self.add(name + ".blob", blob, "B")
+    def write(self, path):
+        self.add("meta", json.dumps(self.meta).encode("utf-8"), "B")
+        offset = HEADER.size + ENTRY.size * len(self.sections)
+        entries = []
+        for name, typecode, data in self.sections:
+            offset += -offset % ALIGN
+            size = memoryview(data).nbytes
+            entries.append((name, typecode, offset, size))
+            offset += size
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+            for name, typecode, off, size in entries:
+                f.write(ENTRY.pack(name.encode("ascii"), typecode.encode("ascii"), off, size))
+            for (_, _, data), (_, _, off, _) in zip(self.sections, entries):
+                f.write(b"\x00" * (off - f.tell()))
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        magic, version, count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a switchboard snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} (expected {VERSION})")
+        self.version = version
+        self.sections = {}
+        for i in range(count):
+            name, typecode, off, size = ENTRY.unpack_from(view, HEADER.size + i * ENTRY.size)
+            name = name.rstrip(b"\x00").decode("ascii")
+            typecode = typecode.rstrip(b"\x00").decode("ascii")
+            section = view[off:off + size]
+            self.sections[name] = section if typecode == "B" else section.cast(typecode)
+        self.meta = json.loads(bytes(self.sections.get("meta", b"{}")) or b"{}")
+    def __contains__(self, name):
+        return name in self.sections
+    def __getitem__(self, name):
+        return self.sections[name]
+    def get(self, name, default=None):
+        return self.sections.get(name, default)
+    def strings(self, name):
+        return unpack_strings(self.sections[name + ".offsets"], self.sections[name + ".blob"])
@@ -0,0 +1,226 @@
+import csv
+import random
+import threading
+import time
+from datetime import datetime
+from call_parser import to_epoch
+from data_structures.LatencyHistogram import LatencyHistogram
+
+WORKERS = 4
+BATCH_SIZE = 200
+MEMORY_EVERY = 100000
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate * 0.1 if rate else 0)
+        self.tokens = self.burst
+        self.stamp = time.perf_counter()
+        self.lock = threading.Lock()
+    def reset(self):
+        with self.lock:
+            self.tokens = 0.0
+            self.stamp = time.perf_counter()
+    def take(self, n, stop=None):
+        if not self.rate:
+            return True
+        while True:
+            with self.lock:
+                now = time.perf_counter()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= n or n > self.burst and self.tokens >= self.burst:
+                    self.tokens -= n
+                    return True
+                wait = (min(n, self.burst) - self.tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+class StressTest:
+    def __init__(self, central, duration_seconds=60, target_calls=1000, workers=WORKERS, rate=None,
+                 batch_size=BATCH_SIZE, numbers=None, seed=None, on_finish=None, memory_every=MEMORY_EVERY):
+        self.central = central
+        self.duration_seconds = duration_seconds
+        self.target_calls = target_calls
+        self.workers = max(1, workers)
+        self.rate = rate if rate is not None else target_calls / max(1, duration_seconds)
+        self.batch_size = max(1, min(batch_size, int(self.rate / 10 / self.workers) or 1)) if self.rate else batch_size
+        self.numbers = numbers if numbers is not None else list(central.phonebook.keys())
+        self.seed = seed
+        self.on_finish = on_finish
+        self.memory_every = memory_every
+        self.memory = []
+        self.bucket = TokenBucket(self.rate)
+        self.stop_event = threading.Event()
+        self.running = threading.Event()
+        self.lock = threading.Lock()
+        self.remaining = target_calls
+        self.stats = {"generated": 0, "accepted": 0, "blocked": 0, "total_duration": 0.0}
+        self.latency = LatencyHistogram()
+        self.cost = LatencyHistogram()
+        self.pauses = LatencyHistogram()
+        self.per_second = {}
+        self.started = None
+        self.finished = None
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.threads = []
+        self.monitor = None
+    def start(self):
+        self.started = time.perf_counter()
+        self.deadline = self.started + self.duration_seconds
+        self.running.set()
+        self.index = self.central.calls.by_pair
+        self.previous_hook = self.index.pause_hook
+        self.index.pause_hook = self.record_pause
+        if self.memory_every:
+            self.sample_memory()
+        for i in range(self.workers):
+            rng = random.Random(None if self.seed is None else self.seed + i)
+            t = threading.Thread(target=self._work, args=(rng,), name=f"stress-worker-{i}", daemon=True)
+            self.threads.append(t)
+            t.start()
+        self.monitor = threading.Thread(target=self._watch, name="stress-monitor", daemon=True)
+        self.monitor.start()
+        return self
+    def is_alive(self):
+        return self.monitor is not None and self.monitor.is_alive()
+    def is_paused(self):
+        return not self.running.is_set()
+    def _reserve(self):
+        with self.lock:
+            size = min(self.batch_size, self.remaining)
+            self.remaining -= size
+            return size
+    def _work(self, rng):
+        nums = self.numbers
+        choice = rng.choice
+        ingest = self.central.ingest_calls
+        stop = self.stop_event
+        while not stop.is_set():
+            if not self.running.is_set():
+                self.running.wait(0.1)
+                continue
+            if time.perf_counter() - self.paused_total >= self.deadline:
+                break
+            size = self._reserve()
+            if not size:
+                break
+            if not self.bucket.take(size, stop):
+                break
+            start_secs = to_epoch(datetime.now())
+            batch = []
+            while len(batch) < size:
+                caller_number = choice(nums)
+                callee_number = choice(nums)
+                if caller_number == callee_number:
+                    continue
+                dur_secs = rng.randint(1, 300) if rng.random() < 0.9 else rng.randint(300, 3600)
+                batch.append((caller_number, callee_number, start_secs, dur_secs))
+            t0 = time.perf_counter_ns()
+            accepted, blocked = ingest(batch)
+            latency = time.perf_counter_ns() - t0
+            if blocked:
+                is_blocked = self.central.is_blocked
+                total_duration = sum(call[3] for call in batch if not (is_blocked(call[0]) or is_blocked(call[1])))
+            else:
+                total_duration = sum(call[3] for call in batch)
+            with self.lock:
+                self.stats["generated"] += len(batch)
+                self.stats["accepted"] += accepted
+                self.stats["blocked"] += blocked
+                self.stats["total_duration"] += total_duration
+                self.latency.record(latency, len(batch))
+                self.cost.record(latency // len(batch), len(batch))
+                crossed = self.memory_every and (self.stats["accepted"] - accepted) // self.memory_every < self.stats["accepted"] // self.memory_every
+                second = int(time.perf_counter() - self.started)
+                sample = self.per_second.get(second)
+                if sample is None:
+                    self.per_second[second] = [len(batch), accepted, blocked]
+                else:
+                    sample[0] += len(batch)
+                    sample[1] += accepted
+                    sample[2] += blocked
+            if crossed:
+                self.sample_memory()
+    def sample_memory(self):
+        report = self.central.memory_report()
+        with self.lock:
+            self.memory.append((self.stats["accepted"], report["heap"], report["rss"]))
+    def memory_growth(self, per=MEMORY_EVERY):
+        with self.lock:
+            if len(self.memory) < 2:
+                return None
+            (calls0, heap0, rss0), (calls1, heap1, rss1) = self.memory[0], self.memory[-1]
+        if calls1 == calls0:
+            return None
+        return (heap1 - heap0) * per / (calls1 - calls0), (rss1 - rss0) * per / (calls1 - calls0)
+    def record_pause(self, seconds):
+        with self.lock:
+            self.pauses.record(seconds * 1e9)
+        if self.previous_hook is not None:
+            self.previous_hook(seconds)
+    def _watch(self):
+        for t in self.threads:
+            t.join()
+        self.finished = time.perf_counter()
+        if self.index.pause_hook == self.record_pause:
+            self.index.pause_hook = self.previous_hook
+        if self.paused_at is not None:
+            self.paused_total += self.finished - self.paused_at
+            self.paused_at = None
+        if self.on_finish is not None:
+            self.on_finish(self)
+    def pause(self):
+        if self.running.is_set():
+            self.paused_at = time.perf_counter()
+            self.running.clear()
+    def resume(self):
+        if not self.running.is_set():
+            self.paused_total += time.perf_counter() - self.paused_at
+            self.paused_at = None
+            self.bucket.reset()
+            self.running.set()
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        self.running.set()
+        if self.monitor is not None:
+            self.monitor.join(timeout)
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.perf_counter()
+        paused = self.paused_total + (end - self.paused_at if self.paused_at is not None else 0.0)
+        return max(0.0, end - self.started - paused)
+    def throughput(self):
+        with self.lock:
+            last = max(self.per_second, default=-1)
+            return [(second,) + tuple(self.per_second.get(second, (0, 0, 0))) for second in range(last + 1)]
+    def export_csv(self, prefix="stress"):
+        latency_path = prefix + "_latency.csv"
+        throughput_path = prefix + "_throughput.csv"
+        memory_path = prefix + "_memory.csv"
+        with self.lock:
+            buckets = list(self.latency.buckets())
+        with open(latency_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["low_us", "high_us", "calls", "cumulative"])
+            for low, high, count, cumulative in buckets:
+                writer.writerow([f"{low / 1000:.3f}", f"{high / 1000:.3f}", count, f"{cumulative:.6f}"])
+        with open(throughput_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["second", "generated", "accepted", "blocked"])
+            writer.writerows(self.throughput())
+        with self.lock:
+            samples = list(self.memory)
+        with open(memory_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["accepted_calls", "heap_bytes", "rss_bytes"])
+            writer.writerows(samples)
+        return latency_path, throughput_path, memory_path
+    def calls_per_second(self):
+        elapsed = self.elapsed()
+        return self.stats["generated"] / elapsed if elapsed > 0 else 0.0